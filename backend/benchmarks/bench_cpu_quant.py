@@ -0,0 +1,119 @@
+# benchmarks/bench_cpu_quant.py
+"""
+CPU 양자화(int8) 추론과 float 추론의 지연 시간 및 exact-match 정확도를 비교합니다.
+
+사용법 (backend 폴더에서 실행):
+    python -m benchmarks.bench_cpu_quant --model_id models_ml/outputs/merged/<job_id> --limit 20
+"""
+import os
+
+# CPU 서빙 노드 기준으로 비교하기 위해 GPU를 사용하지 않습니다. (torch 임포트 전에 설정)
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+import argparse
+import json
+import re
+import statistics
+import time
+from typing import Dict, List, Any, Optional
+
+import pandas as pd
+
+from models_ml.inference import eval_data
+
+DEFAULT_DATA_FILE = "models_ml/data/uploaded_text-to-sql_data.xlsx"
+
+def normalize_sql(sql: str) -> str:
+    """
+    공백, 대소문자, 마지막 세미콜론 차이를 무시하도록 SQL을 정규화합니다.
+    """
+    return re.sub(r"\s+", " ", str(sql)).strip().rstrip(";").strip().lower()
+
+def load_rows(data_file: str, limit: int) -> List[Dict[str, str]]:
+    if data_file.endswith(".jsonl"):
+        with open(data_file, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        records = pd.read_excel(data_file).fillna("").to_dict(orient="records")
+    rows = []
+    for record in records[:limit]:
+        rows.append({
+            "question": record["question"],
+            "answer": record["answer"],
+            # dummy_data.jsonl처럼 스키마가 context 컬럼에 있는 데이터도 지원
+            "schema": record.get("schema") or record.get("context", ""),
+        })
+    return rows
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_mode(model_id: str, rows: List[Dict[str, str]], dtype: str, quantization: Optional[str]) -> Dict[str, Any]:
+    stats = {}
+    model, tokenizer = eval_data.load_model_and_tokenizer(model_id, dtype, quantization, stats)
+
+    # 첫 호출의 초기화 비용이 지연 시간에 섞이지 않도록 한 번 워밍업
+    eval_data.generate_answer(model, tokenizer, eval_data.build_prompt(rows[0]["question"], rows[0]["schema"]))
+
+    latencies = []
+    predictions = []
+    correct = 0
+    for row in rows:
+        start = time.perf_counter()
+        predicted = eval_data.generate_answer(model, tokenizer, eval_data.build_prompt(row["question"], row["schema"]))
+        latencies.append(time.perf_counter() - start)
+        predictions.append(predicted)
+        correct += normalize_sql(predicted) == normalize_sql(row["answer"])
+
+    return {
+        "mode": quantization or dtype,
+        "load_timings": stats.get("load_timings"),
+        "latency_mean": statistics.mean(latencies),
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p95": percentile(latencies, 0.95),
+        "exact_match": correct / len(rows),
+        "predictions": predictions,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU int8 vs float inference benchmark")
+    parser.add_argument("--model_id", type=str, required=True, help="병합 모델 폴더 또는 Hugging Face 모델 ID")
+    parser.add_argument("--data_file", type=str, default=DEFAULT_DATA_FILE, help="평가 데이터 (.xlsx 또는 .jsonl)")
+    parser.add_argument("--limit", type=int, default=20, help="평가할 샘플 수")
+    parser.add_argument("--float_dtype", type=str, default="float32", help="비교 기준 float dtype (float32, bfloat16)")
+    parser.add_argument("--quantization", type=str, default="int8", help="비교할 양자화 모드")
+    parser.add_argument("--output", type=str, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    rows = load_rows(args.data_file, args.limit)
+    if not rows:
+        raise SystemExit(f"평가 데이터가 없습니다: {args.data_file}")
+
+    float_result = run_mode(args.model_id, rows, args.float_dtype, None)
+    quant_result = run_mode(args.model_id, rows, args.float_dtype, args.quantization)
+
+    agreement = sum(
+        normalize_sql(a) == normalize_sql(b)
+        for a, b in zip(float_result["predictions"], quant_result["predictions"])
+    ) / len(rows)
+    report = {
+        "model_id": args.model_id,
+        "samples": len(rows),
+        "float": float_result,
+        "quantized": quant_result,
+        "speedup_p50": float_result["latency_p50"] / quant_result["latency_p50"],
+        "prediction_agreement": agreement,
+    }
+
+    summary = {key: value for key, value in report.items() if key not in ("float", "quantized")}
+    for name in ("float", "quantized"):
+        summary[name] = {key: value for key, value in report[name].items() if key != "predictions"}
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# benchmarks/bench_load.py
+"""
+main.app을 프로세스 안에서 띄우고 주요 엔드포인트에 동시 요청을 보내 처리량과 지연 시간(p50/p95/p99)을 측정합니다.
+네트워크나 GPU 없이 실행되도록 무작위로 초기화한 작은 causal LM(토크나이저 포함)을 임시 폴더에 만들고,
+레지스트리는 임시 SQLite 파일을 사용합니다.
+
+사용법 (backend 폴더에서 실행):
+    python -m benchmarks.bench_load --concurrency 4 --output bench_load.json
+    python -m benchmarks.bench_load --baseline bench_load.json --tolerance 0.2   # 기준 결과 대비 회귀 시 실패
+"""
+import os
+import sys
+import tempfile
+
+# 작업 폴더/환경 변수는 main 임포트 전에 정해야 합니다. (data_manager, model_manager가 임포트 시점에 읽음)
+WORK_DIR = tempfile.mkdtemp(prefix="bench_load_")
+os.environ["CUDA_VISIBLE_DEVICES"] = ""
+os.environ["HF_HUB_OFFLINE"] = "1"
+os.environ["TRANSFORMERS_OFFLINE"] = "1"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'registry.db')}"
+os.environ["MODEL_LIST_CACHE_TTL"] = os.environ.get("MODEL_LIST_CACHE_TTL", "2")
+os.environ["GC_INTERVAL_SECONDS"] = "0"
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+CORPUS_FILE = os.path.join(BACKEND_DIR, "dummy_data.jsonl")
+# 결과/기준 파일 경로는 작업 폴더로 이동하기 전 위치(호출한 폴더) 기준으로 해석합니다.
+INVOKE_DIR = os.getcwd()
+os.chdir(WORK_DIR)
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import time
+from typing import Dict, List, Any, Callable, Awaitable
+
+import httpx
+import pandas as pd
+
+SCENARIOS = ("inference", "data_read", "data_write", "models")
+
+class InferenceFailed(Exception):
+    """run_inference는 실패해도 200과 오류 메시지를 반환하므로, 생성 단계까지 끝나지 않은 응답을 오류로 집계합니다."""
+
+def load_corpus() -> List[Dict[str, str]]:
+    with open(CORPUS_FILE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def build_tiny_model(model_dir: str, corpus: List[Dict[str, str]], seed: int = 0):
+    """
+    dummy_data.jsonl로 작은 BPE 토크나이저를 학습하고, 무작위 가중치의 2층 Llama 모델과 함께 저장합니다.
+    """
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    texts = [f"{row['context']} {row['question']} {row['answer']}" for row in corpus]
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    tokenizer.train_from_iterator(texts, trainers.BpeTrainer(
+        vocab_size=512,
+        special_tokens=["<unk>", "<bos>", "<eos>", "<pad>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+    ))
+    fast_tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, bos_token="<bos>", eos_token="<eos>", unk_token="<unk>", pad_token="<pad>",
+        model_input_names=["input_ids", "attention_mask"],
+    )
+    fast_tokenizer.save_pretrained(model_dir)
+
+    config = LlamaConfig(
+        vocab_size=len(fast_tokenizer), hidden_size=64, intermediate_size=128,
+        num_hidden_layers=2, num_attention_heads=4, num_key_value_heads=4,
+        max_position_embeddings=1024, bos_token_id=1, eos_token_id=2, pad_token_id=3,
+    )
+    torch.manual_seed(seed)
+    LlamaForCausalLM(config).save_pretrained(model_dir, safe_serialization=True)
+
+def seed_data(corpus: List[Dict[str, str]], rows: int):
+    """
+    text-to-sql 엑셀 파일에 rows개의 행을 채웁니다. (data_manager가 읽는 파일 경로와 동일)
+    """
+    from models_ml.services import data_manager
+    records = []
+    for index in range(rows):
+        row = corpus[index % len(corpus)]
+        records.append({"id": index + 1, "question": row["question"], "answer": row["answer"], "schema": row["context"]})
+    pd.DataFrame(records).to_excel(data_manager.get_typed_file_path("text-to-sql"), index=False)
+
+async def seed_registry(model_dir: str, count: int):
+    from models_ml.services import model_manager
+    from models_ml.shared_models import RegisterModelRequest
+    for index in range(count):
+        await model_manager.register_trained_model(RegisterModelRequest(
+            job_id=f"bench-{index:04d}",
+            base_model_id="bench/tiny-llama" if index % 2 == 0 else "bench/other",
+            adapter_path=os.path.join(WORK_DIR, "adapters", f"bench-{index:04d}"),
+            merged_path=model_dir,
+            status="completed" if index % 5 else "failed",
+            eval_accuracy=random.random(),
+            eval_loss=random.random(),
+            lora_r=64,
+        ))
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_scenario(name: str, make_request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+                       client: httpx.AsyncClient, requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    make_request(client, i)를 requests번, 최대 concurrency개씩 동시에 실행하고 지연 시간 통계를 계산합니다.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = {}
+
+    async def one(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, index)
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    wall = time.perf_counter() - wall_start
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_seconds": wall,
+        "throughput_rps": requests / wall if wall else 0.0,
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": max(latencies),
+    }
+    print(f"[{name}] {requests}건, 동시성 {concurrency}: {result['throughput_rps']:.2f} req/s, "
+          f"p50={result['latency_p50'] * 1000:.1f}ms p95={result['latency_p95'] * 1000:.1f}ms "
+          f"p99={result['latency_p99'] * 1000:.1f}ms, 오류={errors or 0}")
+    return result
+
+def build_requests(model_dir: str, corpus: List[Dict[str, str]], seed_rows: int) -> Dict[str, Callable]:
+    async def inference(client: httpx.AsyncClient, index: int):
+        row = corpus[index % len(corpus)]
+        response = await client.post("/run_inference", json={
+            "model_id": model_dir,
+            "question": row["question"],
+            "schema_info": row["context"],
+            "bnb_4bit_compute_dtype": "float32",
+        })
+        if response.status_code == 200 and "generate_seconds" not in response.json().get("stats", {}):
+            raise InferenceFailed(response.json().get("predicted_sql"))
+        return response
+
+    async def data_read(client: httpx.AsyncClient, index: int):
+        return await client.get("/data-entries", params={"file_type": "text-to-sql"})
+
+    async def data_write(client: httpx.AsyncClient, index: int):
+        # 추가 -> 수정 -> 삭제를 번갈아 실행. 수정은 앞쪽 시드 행, 삭제는 뒤쪽 시드 행을 대상으로 하여 서로 겹치지 않게 합니다.
+        row = corpus[index % len(corpus)]
+        operation = index % 3
+        if operation == 0:
+            return await client.post("/add-data/text-to-sql", json={
+                "question": row["question"], "answer": row["answer"], "schema": row["context"],
+            })
+        if operation == 1:
+            return await client.post("/update-data/text-to-sql", json={
+                "id": 1 + (index // 3) % max(1, seed_rows // 2),
+                "question": row["question"], "answer": row["answer"], "schema": row["context"],
+            })
+        return await client.post("/delete-data/text-to-sql", json={"id": seed_rows - index // 3})
+
+    async def models(client: httpx.AsyncClient, index: int):
+        filters = [{}, {"status": "completed"}, {"base_model_id": "bench/tiny-llama"}, {"limit": 10, "offset": 10}]
+        return await client.get("/api/models", params=filters[index % len(filters)])
+
+    return {"inference": inference, "data_read": data_read, "data_write": data_write, "models": models}
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    기준 결과 대비 p95 지연이 (1 + tolerance)배를 넘거나, 처리량이 (1 - tolerance)배 아래로 떨어진 시나리오를 찾습니다.
+    """
+    regressions = []
+    for name, result in report["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if result["latency_p95"] > base["latency_p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['latency_p95'] * 1000:.1f}ms -> {result['latency_p95'] * 1000:.1f}ms")
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput_rps']:.2f} -> {result['throughput_rps']:.2f} req/s")
+        if sum(result["errors"].values()) > sum(base["errors"].values()):
+            regressions.append(f"{name}: errors {base['errors']} -> {result['errors']}")
+    return regressions
+
+async def run(args) -> Dict[str, Any]:
+    import main
+    from models_ml.services import model_manager
+
+    corpus = load_corpus()
+    model_dir = os.path.join(WORK_DIR, "tiny-model")
+    build_tiny_model(model_dir, corpus, args.seed)
+    seed_data(corpus, args.seed_rows)
+
+    # ASGITransport는 lifespan을 실행하지 않으므로 시작 훅을 직접 실행
+    for handler in main.app.router.on_startup:
+        result = handler()
+        if asyncio.iscoroutine(result):
+            await result
+    await seed_registry(model_dir, args.registry_rows)
+
+    scenario_requests = {
+        "inference": args.inference_requests,
+        "data_read": args.requests,
+        "data_write": args.requests,
+        "models": args.requests,
+    }
+    make_requests = build_requests(model_dir, corpus, args.seed_rows)
+    report = {"config": vars(args), "scenarios": {}}
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            if "inference" in args.scenarios:
+                # 첫 요청의 초기화 비용(토크나이저/커널 준비)이 지연 시간에 섞이지 않도록 한 번 워밍업
+                await make_requests["inference"](client, 0)
+            for name in args.scenarios:
+                report["scenarios"][name] = await run_scenario(
+                    name, make_requests[name], client, scenario_requests[name], args.concurrency
+                )
+    finally:
+        await model_manager.dispose_engines()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end API load benchmark with a tiny local model")
+    parser.add_argument("--scenarios", type=str, default=",".join(SCENARIOS), help=f"실행할 시나리오 ({', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 요청 수")
+    parser.add_argument("--requests", type=int, default=60, help="데이터/레지스트리 시나리오별 요청 수")
+    parser.add_argument("--inference_requests", type=int, default=8, help="추론 시나리오 요청 수")
+    parser.add_argument("--seed_rows", type=int, default=200, help="엑셀 데이터 초기 행 수")
+    parser.add_argument("--registry_rows", type=int, default=50, help="레지스트리 초기 모델 수")
+    parser.add_argument("--seed", type=int, default=0, help="모델 초기화 시드")
+    parser.add_argument("--output", type=str, default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", type=str, default=None, help="비교할 기준 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="기준 대비 허용 저하 비율")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"알 수 없는 시나리오입니다: {', '.join(sorted(unknown))}")
+
+    output = os.path.join(INVOKE_DIR, args.output) if args.output else None
+    baseline_path = os.path.join(INVOKE_DIR, args.baseline) if args.baseline else None
+
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    regressions = []
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+        report["baseline"] = {"path": baseline_path, "tolerance": args.tolerance, "regressions": regressions}
+
+    print(json.dumps(report["scenarios"], indent=2, ensure_ascii=False))
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if regressions:
+        raise SystemExit("기준 대비 성능 저하:\n" + "\n".join(regressions))
+
+if __name__ == "__main__":
+    main()
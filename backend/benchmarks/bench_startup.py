@@ -0,0 +1,149 @@
+# benchmarks/bench_startup.py
+"""
+API 서버의 기동 시간(main 임포트 + 시작 훅 + 첫 레지스트리 요청)을 측정하고 예산을 넘으면 실패합니다.
+매 실행마다 새 프로세스에서 측정하며, 기동 중 torch/transformers 등 무거운 ML 모듈이 로드되면 실패로 처리합니다.
+
+`import fastapi` 자체가 환경에 따라 0.6~0.9초 걸리므로(fastapi.openapi.models의 pydantic 모델 생성),
+예산은 절대 시간이 아니라 같은 조건의 새 프로세스에서 `import fastapi`만 한 기준선 대비 증가분(app_overhead_seconds)에 적용합니다.
+참고로 첫 /api/models 요청에 필요한 sqlalchemy(orm + asyncio) 임포트가 약 0.3초로 증가분의 대부분입니다. (framework_seconds)
+
+측정값 예시 (GPU 없는 개발 컨테이너, 5회 중앙값):
+    fastapi 기준선 0.75s, fastapi + sqlalchemy 1.10s, 전체 기동 1.36s (임포트 1.25s + 시작 훅 0.05s + 첫 요청 0.05s)
+    -> 증가분 0.59s, 이 중 앱 코드 자체(프레임워크 제외)는 약 0.25s. 절대 시간 1초 미만은 fastapi 임포트 때문에 달성할 수 없습니다.
+
+사용법 (backend 폴더에서 실행):
+    python -m benchmarks.bench_startup --runs 5 --budget_seconds 0.75
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, Any, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 기동 시 로드되면 안 되는 모듈 (첫 추론/학습 요청 시 로드되어야 함)
+HEAVY_MODULES = ("torch", "transformers", "accelerate", "peft", "huggingface_hub", "pandas")
+
+# 자식 프로세스에서 실행할 측정 코드
+CHILD_SCRIPT = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    import httpx
+    for handler in main.app.router.on_startup:
+        result = handler()
+        if asyncio.iscoroutine(result):
+            await result
+    started = time.perf_counter()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get("/api/models")
+        response.raise_for_status()
+    first_request = time.perf_counter()
+    await main.model_manager.dispose_engines()
+    return started, first_request
+
+started, first_request = asyncio.run(boot())
+print(json.dumps({
+    "import_seconds": imported - start,
+    "startup_seconds": started - imported,
+    "first_request_seconds": first_request - started,
+    "total_seconds": first_request - start,
+    "heavy_modules_loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+# 기준선: 앱 코드 없이 프레임워크만 임포트하는 시간
+BASELINE_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import fastapi
+fastapi_imported = time.perf_counter()
+import sqlalchemy.orm, sqlalchemy.ext.asyncio
+framework_imported = time.perf_counter()
+print(json.dumps({
+    "fastapi_seconds": fastapi_imported - start,
+    "framework_seconds": framework_imported - start,
+}))
+"""
+
+def run_child(script: str, work_dir: str) -> Dict[str, Any]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'registry.db')}"
+    env["ML_WARMUP"] = "0"
+    env["GC_INTERVAL_SECONDS"] = "0"
+    completed = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", script],
+        cwd=work_dir, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"기동 측정 실패:\n{completed.stderr}")
+    # 시작 훅의 print 출력 뒤 마지막 줄이 측정 결과입니다.
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def summarize(results: List[Dict[str, Any]], key: str) -> Dict[str, float]:
+    values = [result[key] for result in results]
+    return {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+def main():
+    parser = argparse.ArgumentParser(description="API startup time benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="측정 반복 횟수 (매번 새 프로세스)")
+    parser.add_argument("--budget_seconds", type=float, default=0.75,
+                        help="`import fastapi` 기준선 대비 기동 시간 증가분(중앙값) 예산")
+    parser.add_argument("--total_budget_seconds", type=float, default=None, help="전체 기동 시간(중앙값) 예산 (선택)")
+    parser.add_argument("--output", type=str, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        # 매 실행마다 빈 작업 폴더(빈 레지스트리)에서 기동
+        # 기준선과 앱 기동을 번갈아 측정하여 시스템 부하 변화가 양쪽에 같이 반영되도록 합니다.
+        with tempfile.TemporaryDirectory() as work_dir:
+            baseline = run_child(BASELINE_SCRIPT, work_dir)
+            result = run_child(CHILD_SCRIPT, work_dir)
+        result.update(baseline)
+        result["app_overhead_seconds"] = result["total_seconds"] - baseline["fastapi_seconds"]
+        results.append(result)
+
+    heavy_modules = sorted({name for result in results for name in result["heavy_modules_loaded"]})
+    report = {
+        "runs": args.runs,
+        "budget_seconds": args.budget_seconds,
+        "total_budget_seconds": args.total_budget_seconds,
+        "fastapi_seconds": summarize(results, "fastapi_seconds"),
+        "framework_seconds": summarize(results, "framework_seconds"),
+        "import_seconds": summarize(results, "import_seconds"),
+        "startup_seconds": summarize(results, "startup_seconds"),
+        "first_request_seconds": summarize(results, "first_request_seconds"),
+        "total_seconds": summarize(results, "total_seconds"),
+        "app_overhead_seconds": summarize(results, "app_overhead_seconds"),
+        "heavy_modules_loaded": heavy_modules,
+    }
+    failures = []
+    if report["app_overhead_seconds"]["median"] > args.budget_seconds:
+        failures.append(f"기동 시간 증가분 중앙값 {report['app_overhead_seconds']['median']:.2f}s가 "
+                        f"예산 {args.budget_seconds:.2f}s를 초과했습니다.")
+    if args.total_budget_seconds is not None and report["total_seconds"]["median"] > args.total_budget_seconds:
+        failures.append(f"기동 시간 중앙값 {report['total_seconds']['median']:.2f}s가 "
+                        f"예산 {args.total_budget_seconds:.2f}s를 초과했습니다.")
+    report["passed"] = not failures and not heavy_modules
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if heavy_modules:
+        raise SystemExit(f"기동 중 무거운 모듈이 로드되었습니다: {', '.join(heavy_modules)}")
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+if __name__ == "__main__":
+    main()
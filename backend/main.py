@@ -1,21 +1,28 @@
 #main.py
-from fastapi import FastAPI, HTTPException, UploadFile, File, Query
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, BackgroundTasks, Response, Body
+from pydantic import BaseModel, ValidationError
 import subprocess
 import os
 import shutil
+import datetime
+from typing import Optional, Dict, Any
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
+from fastapi.encoders import jsonable_encoder
 
 # 모든 Pydantic 모델을 shared_models에서 임포트합니다.
 from models_ml.shared_models import (
-    TrainingRequest, InferenceRequest, DataEntry, NewDataEntry, 
-    DeleteRequest, HuggingFaceLoginRequest, ModelActionRequest
+    TrainingRequest, InferenceRequest, DataEntry, NewDataEntry, NewOAQnAEntry,
+    DeleteRequest, HuggingFaceLoginRequest, ModelActionRequest, ProfilingSettingsRequest, EvaluationRequest
 )
 
 # 서비스 매니저들 임포트
-from models_ml.services import training_manager, data_manager, inference_manager, model_manager 
+from models_ml.services import training_manager, data_manager, inference_manager, model_manager, storage_manager, resource_scheduler, metrics, profiling_manager, evaluation_manager
 
-app = FastAPI(on_startup=[model_manager.create_db_tables])
+app = FastAPI(
+    on_startup=[model_manager.create_db_tables, storage_manager.start_gc_sweeper, inference_manager.warmup_inference_modules],
+    on_shutdown=[model_manager.dispose_engines],
+)
 
 origins = [
     "http://localhost:5173",
@@ -28,8 +35,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Trace-Id"],
 )
 
+# X-Profile 헤더 또는 샘플링 설정에 따라 추론/학습 요청을 프로파일링
+app.middleware("http")(profiling_manager.profiling_middleware)
+
 @app.post("/upload-text-to-sql-data") # Text-to-SQL용 업로드
 async def upload_text_to_sql_data(file: UploadFile = File(...)):
     return await data_manager.upload_typed_data(file, "text-to-sql")
@@ -47,13 +58,15 @@ async def get_data_entries(file_type: str = Query(..., description="데이터의
     return data_manager.get_data_entries(file_type)
 
 @app.post("/add-data/{file_type}")
-async def add_data(file_type: str, entry: BaseModel): # entry는 NewDataEntry 또는 NewOAQnAEntry가 될 수 있도록 BaseModel로 받음
-    if file_type == "text-to-sql":
-        typed_entry = NewDataEntry(**entry.model_dump())
-    elif file_type == "oa-qna":
-        typed_entry = NewOAQnAEntry(**entry.model_dump())
-    else:
+async def add_data(file_type: str, entry: Dict[str, Any] = Body(...)): # entry는 file_type에 따라 NewDataEntry 또는 NewOAQnAEntry로 검증
+    entry_models = {"text-to-sql": NewDataEntry, "oa-qna": NewOAQnAEntry}
+    if file_type not in entry_models:
         raise HTTPException(status_code=400, detail="유효하지 않은 파일 유형입니다.")
+    try:
+        typed_entry = entry_models[file_type](**entry)
+    except ValidationError as e:
+        # 본문 모델을 직접 검증하므로 FastAPI 기본 검증과 같이 422로 응답합니다.
+        raise HTTPException(status_code=422, detail=jsonable_encoder(e.errors()))
     return data_manager.add_data(typed_entry, file_type)
 
 @app.post("/update-data/{file_type}")
@@ -70,21 +83,78 @@ async def start_training_test(request_data: TrainingRequest):
 
 @app.post("/run_inference")
 async def execute_inference(request_data: InferenceRequest):
-    return inference_manager.get_inference_result(request_data)
+    return await inference_manager.get_inference_result(request_data)
 
 @app.post("/huggingface/login")
 async def huggingface_login(request: HuggingFaceLoginRequest):
     return training_manager.huggingface_login(request)
 
 @app.get("/api/models")
-async def get_models_list():
-    models = model_manager.get_all_models()
-    return {"status": "success", "data": [model_manager.ModelEntryResponse.model_validate(model) for model in models]}
+async def get_models_list(
+    status: Optional[str] = Query(None, description="모델 상태 필터 (completed, failed, deployed, inactive)"),
+    base_model_id: Optional[str] = Query(None, description="베이스 모델 ID 필터"),
+    date_from: Optional[datetime.datetime] = Query(None, description="학습일 시작 범위"),
+    date_to: Optional[datetime.datetime] = Query(None, description="학습일 종료 범위"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    result = await model_manager.list_models(status, base_model_id, date_from, date_to, limit, offset)
+    return {"status": "success", **result}
 
 @app.post("/api/models/activate")
-async def activate_model_api(request: ModelActionRequest):
-    return model_manager.activate_model(request.job_id)
+async def activate_model_api(request: ModelActionRequest, background_tasks: BackgroundTasks):
+    result = await model_manager.activate_model(request.job_id)
+    # 배포된 모델을 페이지 캐시에 미리 올려 첫 추론의 콜드 스타트를 줄임
+    background_tasks.add_task(inference_manager.prefetch_registry_model, request.job_id)
+    return result
 
 @app.post("/api/models/delete")
-async def delete_model_api(request: ModelActionRequest):
-    return model_manager.delete_model(request.job_id)
\ No newline at end of file
+async def delete_model_api(request: ModelActionRequest, background_tasks: BackgroundTasks):
+    result = await model_manager.delete_model(request.job_id)
+    # 대용량 폴더 삭제는 응답 이후 백그라운드에서 진행
+    background_tasks.add_task(storage_manager.reclaim_model, request.job_id)
+    return result
+
+@app.post("/api/models/evaluate")
+async def evaluate_model_api(request: EvaluationRequest, background_tasks: BackgroundTasks):
+    # text-to-sql 데이터로 실행 정확도를 평가 (생성 + SQL 실행은 백그라운드에서 진행)
+    plan = await evaluation_manager.prepare_evaluation(request)
+    background_tasks.add_task(evaluation_manager.run_evaluation, plan)
+    return {"status": "success", "message": f"모델 '{request.job_id}'의 실행 정확도 평가를 시작했습니다. ({len(plan['rows'])}개 행)"}
+
+@app.get("/api/models/{job_id}/evaluation")
+async def get_model_evaluation_api(job_id: str):
+    return {"status": "success", "data": await evaluation_manager.get_evaluation(job_id)}
+
+@app.get("/api/scheduler/allocations")
+async def scheduler_allocations_api():
+    # 장치별 메모리 예약 현황과 대기열
+    return {"status": "success", "data": resource_scheduler.scheduler.snapshot()}
+
+@app.get("/metrics")
+async def metrics_api():
+    # Prometheus 스크레이프용 지표 (추론 단계별 지연, 엑셀/DB 호출 시간, 학습 시간, 메모리/캐시 게이지)
+    content, content_type = metrics.render_metrics()
+    return Response(content=content, media_type=content_type)
+
+@app.get("/api/profiling/settings")
+async def profiling_settings_api():
+    return {"status": "success", "data": profiling_manager.get_settings()}
+
+@app.post("/api/profiling/settings")
+async def update_profiling_settings_api(request: ProfilingSettingsRequest):
+    settings = profiling_manager.update_settings(request.enabled, request.sample_rate, request.torch_profiler)
+    return {"status": "success", "data": settings}
+
+@app.get("/api/profiling/traces")
+async def list_traces_api():
+    return {"status": "success", "data": profiling_manager.list_traces()}
+
+@app.get("/api/profiling/traces/{trace_id}/{file_name}")
+async def download_trace_api(trace_id: str, file_name: str):
+    return FileResponse(profiling_manager.get_trace_file_path(trace_id, file_name), filename=f"{trace_id}-{file_name}")
+
+@app.post("/api/storage/gc")
+async def storage_gc_api(dry_run: bool = Query(False, description="True이면 삭제하지 않고 회수 가능한 용량만 보고")):
+    report = await storage_manager.run_gc(dry_run=dry_run)
+    return {"status": "success", "data": report}
\ No newline at end of file
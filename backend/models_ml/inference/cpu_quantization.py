@@ -0,0 +1,125 @@
+# models_ml/inference/cpu_quantization.py
+import os
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+import torch
+from accelerate import init_empty_weights
+from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+from transformers import AutoConfig, AutoModelForCausalLM, GenerationConfig
+
+from models_ml.inference import model_loader
+
+# 지원하는 CPU 양자화 모드
+# int4는 torch 기본 CPU 커널이 없어(별도 torchao 등 필요) 지원하지 않습니다.
+SUPPORTED_QUANTIZATION = ("int8",)
+
+def quantized_cache_path(model_dir: str, mode: str) -> str:
+    """
+    양자화 결과(state_dict)를 병합 모델 폴더 안(quantized/)에 캐시합니다. 모델 폴더를 삭제하면 함께 삭제됩니다.
+    모듈 전체를 pickle하지 않으므로 torch/transformers 버전이 바뀌어도 읽을 수 있고, weights_only=True로 안전하게 로드합니다.
+    """
+    return os.path.join(model_dir, "quantized", f"model-{mode}.state_dict.pt")
+
+def quantize_model(model: torch.nn.Module, mode: str) -> torch.nn.Module:
+    """
+    Linear 레이어의 가중치를 int8로 동적 양자화합니다. (활성값은 추론 시점에 int8로 변환)
+    """
+    if mode not in SUPPORTED_QUANTIZATION:
+        raise ValueError(f"지원하지 않는 양자화 모드입니다: {mode} (지원: {', '.join(SUPPORTED_QUANTIZATION)})")
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _load_float_model(model_id: str) -> torch.nn.Module:
+    # 동적 양자화는 float32 가중치를 입력으로 받으므로 CPU에 float32로 로드합니다.
+    model_dir = model_loader.resolve_safetensors_model(model_id)
+    if model_dir is not None:
+        model, _ = model_loader.load_registry_model(model_dir, torch.float32, device="cpu")
+        return model
+    # .bin 가중치 등: low_cpu_mem_usage 로딩 내부의 init_empty_weights 구간만 분리할 수 없어 로드 전체를 직렬화
+    with model_loader.MODEL_INIT_LOCK:
+        return AutoModelForCausalLM.from_pretrained(
+            model_id,
+            torch_dtype=torch.float32,
+            low_cpu_mem_usage=True,
+            trust_remote_code=True,
+        )
+
+def _swap_linear_layers(module: torch.nn.Module):
+    """
+    nn.Linear를 quantize_dynamic이 만드는 것과 같은 동적 양자화 Linear로 바꿉니다.
+    quantize_dynamic은 가중치 값으로 양자화 파라미터를 계산하므로 meta 텐서(빈 가중치)에는 쓸 수 없어, 구조만 직접 바꿉니다.
+    """
+    for name, child in module.named_children():
+        if type(child) is torch.nn.Linear: # quantize_dynamic과 같이 정확한 타입만 교체
+            setattr(module, name, DynamicQuantizedLinear(
+                child.in_features, child.out_features, bias_=child.bias is not None, dtype=torch.qint8
+            ))
+        else:
+            _swap_linear_layers(child)
+
+def _load_cached_model(model_id: str, cache_path: str) -> torch.nn.Module:
+    """
+    빈 가중치 모델에 양자화 구조를 만들고 캐시된 state_dict를 연결합니다. (float 가중치 로드와 양자화를 건너뜀)
+    """
+    state_dict = torch.load(cache_path, map_location="cpu", weights_only=True)
+    config = AutoConfig.from_pretrained(model_id, trust_remote_code=True)
+    model_loader.warm_up_model_init(config)
+    # load_state_dict(assign=True)도 register_parameter를 거치므로 락 안에서 연결합니다. (이미 읽은 텐서라 I/O 없음)
+    with model_loader.MODEL_INIT_LOCK:
+        with init_empty_weights(include_buffers=False):
+            model = AutoModelForCausalLM.from_config(config, torch_dtype=torch.float32, trust_remote_code=True)
+        _swap_linear_layers(model)
+        # 양자화 후에는 lm_head와 임베딩이 별도 가중치이므로 tie_weights를 호출하지 않습니다.
+        model.load_state_dict(state_dict, strict=True, assign=True)
+    if os.path.exists(os.path.join(model_id, "generation_config.json")):
+        model.generation_config = GenerationConfig.from_pretrained(model_id)
+    return model
+
+def _save_cache(model: torch.nn.Module, cache_path: str):
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # 같은 모델의 첫 요청이 동시에 들어와도 서로의 임시 파일을 덮어쓰지 않도록 요청마다 다른 임시 파일에 저장합니다.
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as temp_file:
+        temp_path = temp_file.name
+    try:
+        torch.save(model.state_dict(), temp_path)
+        os.replace(temp_path, cache_path) # 저장 도중 실패해도 불완전한 캐시가 남지 않도록
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def load_quantized_model(model_id: str, mode: str) -> Tuple[torch.nn.Module, Dict[str, float]]:
+    """
+    CPU 추론용 양자화 모델을 로드합니다.
+    로컬 모델 폴더는 처음 한 번만 양자화하고 결과를 캐시하여, 이후에는 캐시 파일을 바로 읽습니다.
+    반환값: (model, 단계별 소요 시간)
+    """
+    if mode not in SUPPORTED_QUANTIZATION:
+        raise ValueError(f"지원하지 않는 양자화 모드입니다: {mode} (지원: {', '.join(SUPPORTED_QUANTIZATION)})")
+
+    timings = {}
+    start = time.perf_counter()
+    cache_path: Optional[str] = quantized_cache_path(model_id, mode) if os.path.isdir(model_id) else None
+
+    if cache_path and os.path.exists(cache_path):
+        model = _load_cached_model(model_id, cache_path)
+        timings["cache_load"] = time.perf_counter() - start
+    else:
+        model = _load_float_model(model_id)
+        timings["float_load"] = time.perf_counter() - start
+
+        step = time.perf_counter()
+        model = quantize_model(model.eval(), mode)
+        timings["quantize"] = time.perf_counter() - step
+
+        if cache_path:
+            step = time.perf_counter()
+            _save_cache(model, cache_path)
+            timings["cache_save"] = time.perf_counter() - step
+            print(f"양자화 모델 캐시 저장: {cache_path}")
+
+    model.eval()
+    timings["total"] = time.perf_counter() - start
+    return model, timings
@@ -1,11 +1,17 @@
 # models_ml/inference/eval_data.py
+import time
+from typing import Optional
+
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, StoppingCriteria, StoppingCriteriaList
 
-# bnb_4bit_compute_dtype을 인자로 받도록 수정합니다.
-def run_inference(model_id: str, question: str, schema: str, bnb_4bit_compute_dtype: str = 'bfloat16') -> str:
+from models_ml.inference import model_loader
+from models_ml.inference import cpu_quantization
+from models_ml.services import profiling_manager
+
+def build_prompt(question: str, schema: str) -> str:
     """
-    주어진 모델 ID, 질문, 스키마, 그리고 compute_dtype을 사용하여 SQL 쿼리 또는 OA 답변을 추론합니다.
+    학습 때와 같은 채팅 형식의 Text-to-SQL 프롬프트를 만듭니다.
     """
     system_and_user_prompt = f"""You are an text to SQL query translator. Users will ask you questions and you will generate a SQL query based on the provided SCHEMA.
 
@@ -14,45 +20,193 @@ def run_inference(model_id: str, question: str, schema: str, bnb_4bit_compute_dt
 
     {question}"""
 
-    full_prompt_string = f"<bos><start_of_turn>user\n{system_and_user_prompt}<end_of_turn>\n<start_of_turn>model\n"
+    return f"<bos><start_of_turn>user\n{system_and_user_prompt}<end_of_turn>\n<start_of_turn>model\n"
+
+def load_model_and_tokenizer(model_id: str, bnb_4bit_compute_dtype: str = 'bfloat16',
+                             quantization: Optional[str] = None, stats: Optional[dict] = None):
+    """
+    토크나이저와 모델을 로드합니다. quantization('int8')을 지정하면 CPU 양자화 모델을 사용합니다.
+    stats에 dict를 넘기면 모델 로드 시간 분석(load_timings)을 채워 줍니다.
+    """
+    if stats is None:
+        stats = {}
+    # 모델 로드 시 사용할 torch_dtype을 인자로부터 결정
+    compute_dtype = eval(f"torch.{bnb_4bit_compute_dtype}")
+
+    # trust_remote_code=True 추가
+    tokenizer = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True)
+    model_dir = None if quantization else model_loader.resolve_safetensors_model(model_id)
+    if quantization:
+        # GPU가 없는 서빙 노드용: 양자화된 가중치로 CPU에서 추론 (양자화 결과는 모델 폴더에 캐시)
+        model, stats["load_timings"] = cpu_quantization.load_quantized_model(model_id, quantization)
+    elif model_dir is not None:
+        # 학습으로 생성된 병합 모델과 safetensors Hub 모델은 샤드를 mmap으로 복사 없이 로드
+        # (빈 가중치 구성 구간만 MODEL_INIT_LOCK으로 직렬화되므로 여러 모델을 동시에 로드할 수 있음)
+        model, stats["load_timings"] = model_loader.load_registry_model(model_dir, compute_dtype)
+    else:
+        load_start = time.perf_counter()
+        # .bin 가중치나 사전 양자화 모델: from_pretrained 내부의 init_empty_weights 구간만 분리할 수 없어 로드 전체를 직렬화
+        with model_loader.MODEL_INIT_LOCK:
+            model = AutoModelForCausalLM.from_pretrained(
+                model_id,
+                device_map="auto",
+                torch_dtype=compute_dtype, # 인자로부터 받은 dtype 사용
+                trust_remote_code=True # trust_remote_code 추가
+            )
+        stats["load_timings"] = {"total": time.perf_counter() - load_start}
+    model.eval()
+    return model, tokenizer
+
+def load_draft_model(draft_model_id: str, tokenizer, bnb_4bit_compute_dtype: str = 'bfloat16', stats: Optional[dict] = None):
+    """
+    보조 생성(assisted generation)에 사용할 작은 드래프트 모델을 로드합니다.
+    드래프트 모델은 대상 모델과 같은 토크나이저(어휘)를 사용해야 합니다.
+    """
+    draft_stats = {}
+    draft_model, draft_tokenizer = load_model_and_tokenizer(draft_model_id, bnb_4bit_compute_dtype, stats=draft_stats)
+    if draft_tokenizer.get_vocab() != tokenizer.get_vocab():
+        raise ValueError(f"드래프트 모델 '{draft_model_id}'의 토크나이저가 대상 모델과 다릅니다.")
+    if stats is not None:
+        stats["draft_load_timings"] = draft_stats.get("load_timings")
+    return draft_model
+
+def _count_forward_passes(model, input_lengths: list):
+    """
+    모델의 forward 호출마다 입력 토큰 수를 기록하는 hook을 등록합니다. (보조 생성 통계용)
+    """
+    def hook(module, args, kwargs):
+        input_ids = kwargs.get("input_ids")
+        if input_ids is None and args:
+            input_ids = args[0]
+        input_lengths.append(int(input_ids.shape[-1]) if input_ids is not None else 0)
+    return model.register_forward_pre_hook(hook, with_kwargs=True)
+
+def _speculative_stats(method: str, input_lengths: list, prompt_length: int, new_tokens: int) -> dict:
+    """
+    대상 모델의 forward 기록으로 드래프트 수락률과 대상 모델 forward 감소 비율을 계산합니다.
+    첫 검증 호출은 (프롬프트 + 드래프트 후보)를, 이후 호출은 (직전 토큰 1개 + 드래프트 후보)를 입력받습니다.
+    """
+    target_passes = len(input_lengths)
+    drafted = 0
+    if input_lengths:
+        drafted = max(0, input_lengths[0] - prompt_length) + sum(max(0, length - 1) for length in input_lengths[1:])
+    # 매 검증 호출은 수락된 후보 + 대상 모델의 다음 토큰 1개를 만들어 냅니다.
+    accepted = min(drafted, max(0, new_tokens - target_passes))
+    return {
+        "method": method,
+        "target_forward_passes": target_passes,
+        "drafted_tokens": drafted,
+        "accepted_tokens": accepted,
+        "acceptance_rate": accepted / drafted if drafted else 0.0,
+        # 일반 greedy decoding은 새 토큰마다 대상 모델 forward가 1번 필요하므로, 그 대비 forward 감소 비율입니다.
+        # 실제 속도 향상이 아닙니다: 드래프트 모델 forward와 긴 입력 검증 비용이 빠져 있으므로
+        # 속도는 decode_tokens_per_second를 보조 생성 없이 같은 요청을 돌린 값과 비교해야 합니다.
+        "target_forward_reduction": new_tokens / target_passes if target_passes else 1.0,
+    }
 
+class _FirstTokenTimer(StoppingCriteria):
+    """
+    생성을 멈추지 않고, 첫 토큰이 만들어진 시각(= 프롬프트 prefill이 끝난 시각)만 기록합니다.
+    generate()는 매 디코딩 스텝이 끝날 때마다 stopping criteria를 호출합니다.
+    """
+    def __init__(self):
+        self.first_token_time = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+def generate_answer(model, tokenizer, prompt: str, stats: Optional[dict] = None,
+                    assistant_model=None, prompt_lookup_num_tokens: Optional[int] = None) -> str:
+    """
+    이미 로드된 모델로 프롬프트 하나에 대한 답변을 생성합니다. (greedy decoding)
+    assistant_model(작은 드래프트 모델) 또는 prompt_lookup_num_tokens(프롬프트 n-gram 드래프트)를 주면
+    드래프트가 제안한 토큰을 대상 모델이 한 번의 forward로 검증합니다. greedy 결과는 동일합니다.
+    stats에는 단계별 시간(tokenize/prefill/decode/detokenize_seconds)을 기록합니다.
+    """
+    if stats is None:
+        stats = {}
+    if assistant_model is not None and prompt_lookup_num_tokens:
+        raise ValueError("드래프트 모델과 prompt lookup 드래프트는 동시에 사용할 수 없습니다.")
+    generate_start = time.perf_counter()
+    inputs = tokenizer(
+        [prompt],
+        return_tensors="pt",
+        padding=True,
+        truncation=True
+    ).to(model.device)
+    stats["tokenize_seconds"] = time.perf_counter() - generate_start
+
+    speculative_kwargs = {}
+    if assistant_model is not None:
+        speculative_kwargs["assistant_model"] = assistant_model
+    elif prompt_lookup_num_tokens:
+        # 스키마 텍스트에 등장한 테이블/컬럼명 n-gram을 그대로 드래프트로 사용
+        speculative_kwargs["prompt_lookup_num_tokens"] = prompt_lookup_num_tokens
+
+    input_lengths = []
+    hook_handle = _count_forward_passes(model, input_lengths) if speculative_kwargs else None
+    first_token_timer = _FirstTokenTimer()
+    decode_start = time.perf_counter()
     try:
-        # 모델 로드 시 사용할 torch_dtype을 인자로부터 결정
-        compute_dtype = eval(f"torch.{bnb_4bit_compute_dtype}")
-
-        # 2. 토크나이저 및 모델 로드
-        # trust_remote_code=True 추가
-        tokenizer = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True)
-        model = AutoModelForCausalLM.from_pretrained(
-            model_id,
-            device_map="auto",
-            torch_dtype=compute_dtype, # 인자로부터 받은 dtype 사용
-            trust_remote_code=True # trust_remote_code 추가
-        )
-        model.eval()
-
-        inputs = tokenizer(
-            [full_prompt_string],
-            return_tensors="pt",
-            padding=True,
-            truncation=True
-        ).to(model.device)
-
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=256,
-            do_sample=False,
-            pad_token_id=tokenizer.eos_token_id
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=256,
+                do_sample=False,
+                pad_token_id=tokenizer.eos_token_id,
+                stopping_criteria=StoppingCriteriaList([first_token_timer]),
+                **speculative_kwargs
+            )
+    finally:
+        if hook_handle is not None:
+            hook_handle.remove()
+    decode_end = time.perf_counter()
+    # prefill: 프롬프트 처리 + 첫 토큰, decode: 나머지 토큰
+    prefill_end = first_token_timer.first_token_time or decode_end
+    stats["prefill_seconds"] = prefill_end - decode_start
+    stats["decode_seconds"] = decode_end - prefill_end
+
+    generated_text = tokenizer.decode(outputs[0], skip_special_tokens=True)
+    stats["detokenize_seconds"] = time.perf_counter() - decode_end
+    stats["generate_seconds"] = time.perf_counter() - generate_start
+    stats["new_tokens"] = int(outputs.shape[-1] - inputs["input_ids"].shape[-1])
+    if speculative_kwargs:
+        method = "draft_model" if assistant_model is not None else "prompt_lookup"
+        stats["speculative"] = _speculative_stats(method, input_lengths, inputs["input_ids"].shape[-1], stats["new_tokens"])
+        # 측정값: 첫 토큰 이후 실제 디코딩 처리량 (드래프트 모델 비용 포함)
+        stats["speculative"]["decode_tokens_per_second"] = (
+            max(0, stats["new_tokens"] - 1) / stats["decode_seconds"] if stats["decode_seconds"] > 0 else 0.0
         )
 
-        generated_text = tokenizer.decode(outputs[0], skip_special_tokens=True)
+    if "<start_of_turn>model\n" in generated_text:
+        return generated_text.split("<start_of_turn>model\n")[-1].strip()
+    return generated_text.strip()
 
-        if "<start_of_turn>model\n" in generated_text:
-            answer = generated_text.split("<start_of_turn>model\n")[-1].strip()
-        else:
-            answer = generated_text.strip()
+# bnb_4bit_compute_dtype을 인자로 받도록 수정합니다.
+def run_inference(model_id: str, question: str, schema: str, bnb_4bit_compute_dtype: str = 'bfloat16',
+                  quantization: Optional[str] = None, stats: Optional[dict] = None,
+                  draft_model_id: Optional[str] = None, prompt_lookup_num_tokens: Optional[int] = None) -> str:
+    """
+    주어진 모델 ID, 질문, 스키마, 그리고 compute_dtype을 사용하여 SQL 쿼리 또는 OA 답변을 추론합니다.
+    stats에 dict를 넘기면 모델 로드 시간 분석(load_timings) 등 추론 통계를 채워 줍니다.
+    draft_model_id / prompt_lookup_num_tokens를 주면 보조 생성으로 디코딩하고 수락률(stats["speculative"])을 기록합니다.
+    프로파일링 중인 요청이면 모델 로드와 생성을 각각 cProfile(및 torch profiler)로 기록합니다.
+    """
+    if stats is None:
+        stats = {}
+    full_prompt_string = build_prompt(question, schema)
 
-        return answer
+    try:
+        load_start = time.perf_counter()
+        with profiling_manager.profile_section("model_load"):
+            model, tokenizer = load_model_and_tokenizer(model_id, bnb_4bit_compute_dtype, quantization, stats)
+            draft_model = load_draft_model(draft_model_id, tokenizer, bnb_4bit_compute_dtype, stats) if draft_model_id else None
+        stats["model_load_seconds"] = time.perf_counter() - load_start
+        with profiling_manager.model_profile_section("generate"):
+            return generate_answer(model, tokenizer, full_prompt_string, stats,
+                                   assistant_model=draft_model, prompt_lookup_num_tokens=prompt_lookup_num_tokens)
 
     except Exception as e:
         return f"모델 추론 중 오류 발생: {e}"
@@ -60,6 +214,8 @@ def run_inference(model_id: str, question: str, schema: str, bnb_4bit_compute_dt
         # 가비지 컬렉션 및 GPU 메모리 해제
         if 'model' in locals() and model is not None:
             del model
+        if 'draft_model' in locals() and draft_model is not None:
+            del draft_model
         if 'tokenizer' in locals() and tokenizer is not None:
             del tokenizer
         torch.cuda.empty_cache()
@@ -0,0 +1,206 @@
+# models_ml/inference/model_loader.py
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from accelerate import init_empty_weights, dispatch_model, infer_auto_device_map
+from transformers import AutoConfig, AutoModelForCausalLM, GenerationConfig
+
+# safetensors 헤더의 dtype 문자열 -> torch dtype
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+# 페이지 캐시 프리페치에 사용할 스레드 수와 읽기 단위
+PREFETCH_WORKERS = int(os.environ.get("MODEL_PREFETCH_WORKERS", "4"))
+PREFETCH_CHUNK_SIZE = 16 * 1024 * 1024
+
+# init_empty_weights는 nn.Module.register_parameter를 프로세스 전역으로 바꿔치기하므로,
+# 스레드풀에서 여러 모델을 동시에 로드하면 다른 스레드의 파라미터가 meta 장치로 옮겨질 수 있습니다.
+# 빈 가중치로 모델 구조를 만들고 파라미터를 연결(load_state_dict(assign=True))하는 구간만 이 락으로 직렬화합니다.
+# (assign도 register_parameter를 거치므로 포함) 파일 I/O, dtype 변환, 장치 배치는 락 밖에서 동시에 진행됩니다.
+MODEL_INIT_LOCK = threading.Lock()
+
+SAFETENSORS_INDEX_FILE = "model.safetensors.index.json"
+
+def list_safetensors_shards(model_dir: str) -> List[str]:
+    """
+    모델의 safetensors 샤드 목록. 인덱스 파일이 있으면 인덱스가 가리키는 샤드만 사용합니다.
+    (Hub 저장소에 consolidated.safetensors 등 다른 형식의 파일이 함께 있는 경우 제외)
+    """
+    index_path = os.path.join(model_dir, SAFETENSORS_INDEX_FILE)
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            weight_map = json.load(f).get("weight_map", {})
+        return sorted(os.path.join(model_dir, name) for name in set(weight_map.values()))
+    return sorted(glob.glob(os.path.join(model_dir, "*.safetensors")))
+
+def is_registry_model(model_id: str) -> bool:
+    """
+    train_data.py가 저장한 병합 모델처럼 safetensors 샤드가 있는 로컬 폴더인지 확인합니다.
+    """
+    return os.path.isdir(model_id) and bool(list_safetensors_shards(model_id)) \
+        and os.path.exists(os.path.join(model_id, "config.json"))
+
+def resolve_safetensors_model(model_id: str) -> Optional[str]:
+    """
+    model_id(로컬 폴더 또는 Hub ID)를 load_registry_model로 읽을 수 있는 로컬 폴더로 바꿉니다.
+    Hub 모델은 설정 파일과 safetensors 샤드만 받아(이미 받았으면 캐시 사용) 스냅샷 폴더를 반환합니다.
+    safetensors가 없거나(.bin 가중치) 사전 양자화된 모델이면 None을 반환하므로 from_pretrained로 로드해야 합니다.
+    """
+    if os.path.isdir(model_id):
+        model_dir = model_id
+    else:
+        try:
+            from huggingface_hub import snapshot_download
+            model_dir = snapshot_download(model_id, allow_patterns=["*.json", "*.py"])
+            index_path = os.path.join(model_dir, SAFETENSORS_INDEX_FILE)
+            if os.path.exists(index_path):
+                with open(index_path, encoding="utf-8") as f:
+                    shard_patterns = sorted(set(json.load(f).get("weight_map", {}).values()))
+            else:
+                shard_patterns = ["*.safetensors"]
+            model_dir = snapshot_download(model_id, allow_patterns=shard_patterns)
+        except Exception as e:
+            print(f"safetensors 스냅샷을 받을 수 없어 from_pretrained로 로드합니다 ({model_id}): {e}")
+            return None
+    if not is_registry_model(model_dir):
+        return None
+    with open(os.path.join(model_dir, "config.json"), encoding="utf-8") as f:
+        if "quantization_config" in json.load(f):
+            return None
+    return model_dir
+
+def warm_up_model_init(config):
+    """
+    빈 가중치 구성 중 처음 한 번만 일어나는 지연 임포트를 MODEL_INIT_LOCK 밖에서 미리 실행합니다.
+    - 모델 클래스 모듈(예: modeling_llama): transformers가 from_config 안에서 임포트 (원격 코드 모델은 건너뜀)
+    - meta 텐서 초기화 구현(torch._refs): 첫 normal_() 호출 시 임포트되며 수 초가 걸림
+    """
+    try:
+        AutoModelForCausalLM._model_mapping[type(config)]
+    except KeyError:
+        pass
+    torch.empty(1, device="meta").normal_()
+
+def _read_into_page_cache(path: str) -> int:
+    buffer = bytearray(PREFETCH_CHUNK_SIZE)
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            # 커널에 미리 읽기를 요청하고, 힌트가 무시될 경우를 대비해 직접 순차로 읽습니다.
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        total = 0
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            total += read
+    return total
+
+def prefetch_model(model_dir: str, max_workers: int = PREFETCH_WORKERS) -> Dict[str, float]:
+    """
+    모델 샤드를 여러 스레드로 병렬로 읽어 OS 페이지 캐시에 올립니다. (모델 배포 시 백그라운드 실행)
+    이후 mmap 로딩은 디스크 대신 메모리에서 바로 읽게 됩니다.
+    """
+    start = time.perf_counter()
+    shards = list_safetensors_shards(model_dir)
+    if not shards:
+        return {"shards": 0, "bytes": 0, "seconds": 0.0}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(shards)))) as pool:
+        total_bytes = sum(pool.map(_read_into_page_cache, shards))
+    elapsed = time.perf_counter() - start
+    print(f"모델 프리페치 완료: {model_dir} ({len(shards)}개 샤드, {total_bytes} bytes, {elapsed:.2f}s)")
+    return {"shards": len(shards), "bytes": total_bytes, "seconds": elapsed}
+
+def map_safetensors(path: str) -> Dict[str, torch.Tensor]:
+    """
+    safetensors 파일을 mmap으로 열고 각 텐서를 복사 없이 매핑된 메모리 위의 뷰로 반환합니다.
+    ACCESS_COPY(private) 매핑이므로 페이지는 페이지 캐시와 공유되고, 쓰기가 발생할 때만 복사됩니다.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    header_size = struct.unpack("<Q", mapped[:8])[0]
+    header = json.loads(mapped[8:8 + header_size])
+    header.pop("__metadata__", None)
+    data_start = 8 + header_size
+
+    tensors = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        count = (end - begin) // torch.tensor([], dtype=dtype).element_size()
+        if count == 0:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        # torch.frombuffer는 mapped 객체에 대한 참조를 유지하므로 텐서가 살아 있는 동안 매핑도 유지됩니다.
+        tensors[name] = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + begin).view(info["shape"])
+    return tensors
+
+def load_registry_model(model_dir: str, torch_dtype: torch.dtype,
+                        device: Optional[str] = None) -> Tuple[torch.nn.Module, Dict[str, float]]:
+    """
+    레지스트리 모델(병합 모델 폴더)을 mmap 기반으로 로드합니다.
+    device를 지정하지 않으면 GPU가 있을 때 GPU에, 없으면 CPU에 둡니다.
+    반환값: (model, {"io": 초, "deserialize": 초, "device_placement": 초, "total": 초})
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    # 1. I/O: 설정 파일 읽기 + 샤드 mmap (텐서 데이터는 복사하지 않음)
+    config = AutoConfig.from_pretrained(model_dir, trust_remote_code=True)
+    state_dict = {}
+    for shard in list_safetensors_shards(model_dir):
+        state_dict.update(map_safetensors(shard))
+    timings["io"] = time.perf_counter() - start
+
+    # 2. 역직렬화: 가중치 없이 모델 구조를 만들고 mmap 텐서를 그대로 파라미터로 연결 (assign=True)
+    step = time.perf_counter()
+    for name, tensor in state_dict.items():
+        # 저장된 dtype과 요청 dtype이 다를 때만 변환(복사)이 발생합니다.
+        if tensor.is_floating_point() and tensor.dtype != torch_dtype:
+            state_dict[name] = tensor.to(torch_dtype)
+    warm_up_model_init(config)
+    with MODEL_INIT_LOCK: # mmap 텐서를 연결만 하므로 I/O 없이 짧게 끝납니다.
+        with init_empty_weights(include_buffers=False):
+            model = AutoModelForCausalLM.from_config(config, torch_dtype=torch_dtype, trust_remote_code=True)
+        model.load_state_dict(state_dict, strict=False, assign=True)
+        model.tie_weights()
+    not_loaded = [name for name, param in model.named_parameters() if param.device.type == "meta"]
+    if not_loaded:
+        raise ValueError(f"모델 가중치 일부를 찾을 수 없습니다: {not_loaded[:5]}")
+    if os.path.exists(os.path.join(model_dir, "generation_config.json")):
+        model.generation_config = GenerationConfig.from_pretrained(model_dir)
+    model.eval()
+    timings["deserialize"] = time.perf_counter() - step
+
+    # 3. 장치 배치: GPU가 있으면 올리고(여러 장이면 분산), 없으면 mmap 그대로 CPU에서 사용
+    step = time.perf_counter()
+    if device is not None:
+        if device != "cpu":
+            model = model.to(device)
+    elif torch.cuda.device_count() > 1:
+        device_map = infer_auto_device_map(model, no_split_module_classes=model._no_split_modules)
+        model = dispatch_model(model, device_map=device_map)
+    elif torch.cuda.is_available():
+        model = model.to("cuda")
+    timings["device_placement"] = time.perf_counter() - step
+
+    timings["total"] = time.perf_counter() - start
+    print(f"레지스트리 모델 로드: {model_dir} " + ", ".join(f"{key}={value:.2f}s" for key, value in timings.items()))
+    return model, timings
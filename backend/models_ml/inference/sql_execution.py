@@ -0,0 +1,200 @@
+# models_ml/inference/sql_execution.py
+# 실행 정확도(execution accuracy) 평가용 SQL 실행기.
+# 행마다 스키마로 SQLite 메모리 DB를 만들고 (선택적으로 합성 데이터를 채운 뒤) 정답 SQL과 예측 SQL의 결과 집합을 비교합니다.
+# 프로세스 풀 워커에서 실행되므로 표준 라이브러리만 사용합니다. (torch 등을 임포트하지 않음)
+import datetime
+import random
+import re
+import sqlite3
+import time
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+# 결과 비교 시 가져올 최대 행 수 (잘못된 예측 SQL이 카티션 곱을 만들어도 메모리를 넘지 않도록)
+MAX_RESULT_ROWS = 10000
+# progress handler 호출 간격 (SQLite VM 명령 수)
+PROGRESS_HANDLER_STEPS = 1000
+FLOAT_PRECISION = 6
+# 문자열/BLOB 값 하나의 최대 크기 (바이트). randomblob(900000000)처럼 한 번의 함수 호출로 큰 값을 만드는 쿼리는
+# progress handler가 호출되기 전에 메모리를 다 써 버리므로 SQLite 길이 제한으로 막습니다. (초과 시 pred_error)
+MAX_VALUE_BYTES = 16 * 1024
+
+ORDER_BY_PATTERN = re.compile(r"\border\s+by\b", re.IGNORECASE)
+
+# 모델이 생성한 SQL에 허용하는 동작 (읽기 전용 조회). 그 외(쓰기, ATTACH/DETACH, PRAGMA, 트랜잭션 등)는 모두 거부합니다.
+# PRAGMA query_only는 ATTACH로 디스크에 파일을 만드는 것을 막지 못하므로 authorizer로 제한합니다.
+READ_ONLY_ACTIONS = frozenset((sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE))
+
+def _read_only_authorizer(action, arg1, arg2, database, trigger):
+    return sqlite3.SQLITE_OK if action in READ_ONLY_ACTIONS else sqlite3.SQLITE_DENY
+
+def split_statements(schema: str) -> List[str]:
+    return [statement.strip() for statement in schema.split(";") if statement.strip()]
+
+def build_database(schema: str, synthetic_rows: int = 0, seed: int = 0) -> Tuple[sqlite3.Connection, List[str]]:
+    """
+    스키마(CREATE TABLE 문)로 메모리 DB를 만들고, synthetic_rows > 0이면 테이블마다 합성 행을 채웁니다.
+    SQLite가 해석하지 못하는 문장은 건너뛰고 오류 목록으로 반환합니다.
+    반환값: (connection, schema_errors)
+    """
+    connection = sqlite3.connect(":memory:")
+    schema_errors = []
+    for statement in split_statements(schema):
+        try:
+            connection.execute(statement)
+        except sqlite3.Error as e:
+            schema_errors.append(f"{statement[:80]}: {e}")
+    if synthetic_rows > 0:
+        populate_synthetic_rows(connection, synthetic_rows, seed)
+    connection.commit()
+    # 예측 SQL이 데이터를 바꾸거나 다른 DB 파일을 열지 못하도록 읽기 전용으로 전환
+    connection.execute("PRAGMA query_only = ON")
+    connection.set_authorizer(_read_only_authorizer)
+    # 합성 데이터를 채운 뒤에 제한하여 스키마/합성 행에는 영향을 주지 않습니다. (Connection.setlimit은 Python 3.11+)
+    if hasattr(connection, "setlimit"):
+        connection.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, MAX_VALUE_BYTES)
+    return connection, schema_errors
+
+def _synthetic_value(column_type: str, column_name: str, index: int, rows: int, rng: random.Random, is_key: bool):
+    column_type = column_type.upper()
+    if is_key:
+        return index + 1
+    if "INT" in column_type:
+        # *_id 컬럼은 다른 테이블의 키와 조인되도록 같은 범위에서 고릅니다.
+        if column_name.lower().endswith("id"):
+            return rng.randint(1, rows)
+        return rng.randint(0, 100)
+    if any(name in column_type for name in ("REAL", "FLOA", "DOUB", "DEC", "NUM")):
+        return round(rng.uniform(0, 1000), 2)
+    if "DATE" in column_type or "TIME" in column_type:
+        day = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randint(0, 365))
+        return day.isoformat()
+    if "BOOL" in column_type:
+        return rng.randint(0, 1)
+    # 문자열은 GROUP BY/WHERE 결과가 비지 않도록 작은 값 집합에서 고릅니다.
+    return f"{column_name}_{rng.randint(1, max(2, rows // 4))}"
+
+def populate_synthetic_rows(connection: sqlite3.Connection, rows: int, seed: int = 0):
+    """
+    모든 테이블에 rows개의 결정적(seed 고정) 합성 행을 넣습니다.
+    """
+    rng = random.Random(seed)
+    tables = [row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+    for table in tables:
+        columns = connection.execute(f'PRAGMA table_info("{table}")').fetchall()
+        if not columns:
+            continue
+        names = ", ".join(f'"{column[1]}"' for column in columns)
+        placeholders = ", ".join("?" for _ in columns)
+        values = [
+            tuple(_synthetic_value(column[2] or "", column[1], index, rows, rng, bool(column[5])) for column in columns)
+            for index in range(rows)
+        ]
+        try:
+            connection.executemany(f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})', values)
+        except sqlite3.Error:
+            # 제약 조건(UNIQUE, CHECK 등)에 걸리면 행 단위로 넣을 수 있는 것만 넣습니다.
+            for row in values:
+                try:
+                    connection.execute(f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})', row)
+                except sqlite3.Error:
+                    continue
+
+def execute_query(connection: sqlite3.Connection, sql: str, timeout_seconds: float) -> List[tuple]:
+    """
+    SQL을 실행하고 결과 행을 반환합니다. timeout_seconds를 넘으면 progress handler로 실행을 중단합니다.
+    (sqlite3.OperationalError: interrupted)
+    """
+    deadline = time.monotonic() + timeout_seconds
+    connection.set_progress_handler(lambda: int(time.monotonic() > deadline), PROGRESS_HANDLER_STEPS)
+    try:
+        cursor = connection.execute(sql.strip().rstrip(";"))
+        return cursor.fetchmany(MAX_RESULT_ROWS)
+    finally:
+        connection.set_progress_handler(None, 0)
+
+def _normalize_value(value):
+    if isinstance(value, float):
+        value = round(value, FLOAT_PRECISION)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+def results_match(predicted: List[tuple], gold: List[tuple], ordered: bool) -> bool:
+    """
+    결과 집합 비교. 정답 SQL에 ORDER BY가 있으면 순서까지, 없으면 중복을 포함한 다중 집합으로 비교합니다.
+    """
+    predicted = [tuple(_normalize_value(value) for value in row) for row in predicted]
+    gold = [tuple(_normalize_value(value) for value in row) for row in gold]
+    if ordered:
+        return predicted == gold
+    return Counter(predicted) == Counter(gold)
+
+def _classify_error(error: Exception) -> str:
+    return "timeout" if "interrupted" in str(error).lower() else "error"
+
+def evaluate_row(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    행 하나를 평가합니다. (ProcessPoolExecutor 워커에서 실행)
+    task: {"index", "schema", "answer", "predicted", "synthetic_rows", "seed", "timeout_seconds"}
+    반환 status: match, mismatch, pred_error, pred_timeout, gold_error, gold_timeout
+    SQLite 오류 외의 예외(인코딩할 수 없는 문자열의 UnicodeEncodeError, MemoryError 등)도 해당 쿼리의 error로 기록하여
+    워커가 죽거나 풀 전체가 깨지지 않도록 합니다.
+    """
+    result: Dict[str, Any] = {"index": task["index"], "match": False}
+    start = time.perf_counter()
+    connection, schema_errors = build_database(task["schema"], task.get("synthetic_rows", 0), task.get("seed", 0))
+    if schema_errors:
+        result["schema_errors"] = schema_errors
+    try:
+        if not task["predicted"].strip():
+            result.update(status="pred_error", error="빈 예측 SQL")
+            return result
+        try:
+            gold = execute_query(connection, task["answer"], task["timeout_seconds"])
+        except Exception as e:
+            result.update(status=f"gold_{_classify_error(e)}", error=str(e))
+            return result
+        try:
+            predicted = execute_query(connection, task["predicted"], task["timeout_seconds"])
+        except Exception as e:
+            result.update(status=f"pred_{_classify_error(e)}", error=str(e))
+            return result
+        result["match"] = results_match(predicted, gold, ordered=bool(ORDER_BY_PATTERN.search(task["answer"])))
+        result["status"] = "match" if result["match"] else "mismatch"
+        result["gold_rows"] = len(gold)
+        return result
+    finally:
+        connection.close()
+        result["seconds"] = time.perf_counter() - start
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    행별 결과를 집계합니다. 정답 SQL 자체가 실행되지 않는 행은 실행 정확도의 분모에서 제외합니다.
+    """
+    statuses = Counter(result["status"] for result in results)
+    evaluable = sum(count for status, count in statuses.items() if not status.startswith("gold_"))
+    matches = statuses.get("match", 0)
+    return {
+        "total": len(results),
+        "evaluable": evaluable,
+        "matches": matches,
+        "execution_accuracy": matches / evaluable if evaluable else None,
+        "statuses": dict(statuses),
+        # 합성 데이터가 없으면 빈 결과끼리 일치하는 경우가 많으므로 함께 보고합니다.
+        "empty_gold_matches": sum(1 for result in results if result["match"] and result.get("gold_rows") == 0),
+    }
+
+def normalize_prediction(text: Optional[str]) -> str:
+    """
+    모델 출력에서 SQL만 남깁니다. (```sql 코드 블록, 앞뒤 설명 제거)
+    """
+    if not text:
+        return ""
+    block = re.search(r"```(?:sql)?\s*(.*?)```", text, re.IGNORECASE | re.DOTALL)
+    if block:
+        text = block.group(1)
+    return text.strip()
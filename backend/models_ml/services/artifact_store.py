@@ -0,0 +1,140 @@
+# models_ml/services/artifact_store.py
+import hashlib
+import os
+import shutil
+import stat
+from typing import Dict, Any, Iterable
+
+# 모델 저장 디렉토리 (training_manager와 동일)
+OUTPUT_BASE_DIR = "models_ml/outputs"
+# 내용 주소 기반 블롭 저장소: blobs/<sha256 앞 2자리>/<sha256>
+# 작업 폴더의 파일은 블롭의 하드링크(같은 inode)이므로, 기존 파일을 제자리에서 다시 쓰면 같은 블롭을 공유하는
+# 다른 작업의 파일까지 바뀝니다. 블롭을 읽기 전용으로 만들면 작업 자신의 파일까지 쓸 수 없게 되므로 권한은 그대로 두고,
+# 기존 파일을 다시 쓰는 코드는 먼저 detach_file로 분리(copy-on-write)하거나 새 파일에 쓴 뒤 os.replace로 교체합니다.
+BLOB_DIR = os.path.join(OUTPUT_BASE_DIR, "blobs")
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+def hash_file(path: str) -> str:
+    """
+    파일 내용의 sha256 해시를 계산합니다. 대용량 safetensors 샤드를 위해 청크 단위로 읽습니다.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def blob_path(digest: str) -> str:
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+def _replace_with_link(source: str, target: str):
+    """
+    target 파일을 source의 하드링크로 원자적으로 교체합니다.
+    """
+    temp_path = f"{target}.link-tmp"
+    if os.path.lexists(temp_path):
+        os.remove(temp_path)
+    os.link(source, temp_path)
+    os.replace(temp_path, target)
+
+def ingest_file(path: str) -> int:
+    """
+    파일 하나를 블롭 저장소에 넣고, 원래 위치에는 블롭의 하드링크를 둡니다.
+    이미 같은 내용의 블롭이 있으면 파일을 하드링크로 바꾸고 절약된 바이트 수를 반환합니다.
+    """
+    digest = hash_file(path)
+    blob = blob_path(digest)
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+
+    file_stat = os.stat(path)
+    try:
+        os.link(path, blob)
+        return 0
+    except FileExistsError:
+        pass
+
+    blob_stat = os.stat(blob)
+    if (blob_stat.st_dev, blob_stat.st_ino) == (file_stat.st_dev, file_stat.st_ino):
+        return 0 # 이미 저장소에 연결된 파일
+    if blob_stat.st_size != file_stat.st_size:
+        raise ValueError(f"블롭 크기 불일치: {blob}")
+    _replace_with_link(blob, path)
+    return file_stat.st_size
+
+def detach_file(path: str) -> bool:
+    """
+    블롭과 하드링크로 공유 중인 파일을 독립된 복사본으로 바꿉니다. (copy-on-write)
+    다른 링크가 없으면 아무것도 하지 않습니다. 반환값: 복사 여부
+    """
+    if not os.path.isfile(path) or os.stat(path).st_nlink <= 1:
+        return False
+    temp_path = f"{path}.detach-tmp"
+    shutil.copyfile(path, temp_path)
+    # 이전 버전에서 읽기 전용으로 바뀐 블롭이어도 복사본은 쓸 수 있도록 권한을 지정합니다.
+    os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode) | stat.S_IWUSR)
+    os.replace(temp_path, path)
+    return True
+
+def ingest_directories(paths: Iterable[str]) -> Dict[str, Any]:
+    """
+    작업 폴더(어댑터/병합 모델)의 모든 파일을 블롭 저장소로 옮기고 중복 파일을 하드링크로 바꿉니다.
+    파일 경로는 그대로 유지되므로 from_pretrained 로딩이나 폴더 삭제 로직은 바뀌지 않습니다.
+    """
+    stats = {"files": 0, "deduplicated_files": 0, "saved_bytes": 0, "skipped_files": 0}
+    for path in paths:
+        if not os.path.isdir(path):
+            continue
+        for root, _, files in os.walk(path):
+            for name in files:
+                file_path = os.path.join(root, name)
+                if os.path.islink(file_path) or name.endswith((".link-tmp", ".detach-tmp")):
+                    continue
+                stats["files"] += 1
+                try:
+                    saved = ingest_file(file_path)
+                except (OSError, ValueError) as e:
+                    # 하드링크를 지원하지 않는 파일 시스템 등에서는 원본 파일을 그대로 둡니다.
+                    print(f"아티팩트 저장소 등록 건너뜀: {file_path} ({e})")
+                    stats["skipped_files"] += 1
+                    continue
+                if saved:
+                    stats["deduplicated_files"] += 1
+                    stats["saved_bytes"] += saved
+    return stats
+
+def prune_blobs(dry_run: bool = False) -> int:
+    """
+    어떤 작업 폴더에서도 참조하지 않는(링크 수가 1인) 블롭을 삭제하고 회수한 바이트 수를 반환합니다.
+    """
+    reclaimed = 0
+    if not os.path.isdir(BLOB_DIR):
+        return 0
+    for root, _, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                blob_stat = os.stat(path)
+            except OSError:
+                continue
+            if blob_stat.st_nlink > 1:
+                continue
+            if not dry_run:
+                os.remove(path)
+            reclaimed += blob_stat.st_size
+    return reclaimed
+
+def store_stats() -> Dict[str, int]:
+    """
+    블롭 저장소의 블롭 개수와 실제 디스크 사용량을 반환합니다.
+    """
+    blobs = 0
+    total_bytes = 0
+    if os.path.isdir(BLOB_DIR):
+        for root, _, files in os.walk(BLOB_DIR):
+            for name in files:
+                try:
+                    total_bytes += os.stat(os.path.join(root, name)).st_size
+                except OSError:
+                    continue
+                blobs += 1
+    return {"blobs": blobs, "bytes": total_bytes}
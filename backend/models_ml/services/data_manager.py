@@ -1,11 +1,16 @@
 # models_ml/services/data_manager.py
 from fastapi import UploadFile, HTTPException
 from pydantic import BaseModel
-import pandas as pd
 import os
 import shutil
 import json
-from typing import List, Dict, Any # List, Dict, Any 임포트 추가
+from typing import List, Dict, Any, TYPE_CHECKING # List, Dict, Any 임포트 추가
+
+from models_ml.services import metrics
+
+# pandas는 API 기동 시간을 줄이기 위해 엑셀 파일을 처음 읽을 때 임포트합니다.
+if TYPE_CHECKING:
+    import pandas as pd
 
 # 파일 경로 (main.py와 동일하게 유지)
 UPLOAD_FOLDER = "models_ml/data"
@@ -40,6 +45,7 @@ def get_typed_file_path(file_type: str) -> str:
 
 # 헬퍼 함수: 타입에 따라 엑셀 파일 읽기
 def read_excel_file_by_type(file_type: str):
+    import pandas as pd
     file_path_by_type = get_typed_file_path(file_type)
     if not os.path.exists(file_path_by_type):
         # 파일이 없을 경우 빈 DataFrame 반환 (헤더는 공통 헤더로)
@@ -51,7 +57,8 @@ def read_excel_file_by_type(file_type: str):
         else:
             return pd.DataFrame(columns=['id', 'question', 'answer', 'schema']) # 기본값
     try:
-        df = pd.read_excel(file_path_by_type)
+        with metrics.EXCEL_IO_SECONDS.labels(operation="read", file_type=file_type).time():
+            df = pd.read_excel(file_path_by_type)
         df = df.fillna('')
         if 'id' not in df.columns:
             df.insert(0, 'id', range(1, len(df) + 1))
@@ -68,10 +75,11 @@ def read_excel_file_by_type(file_type: str):
 
 
 # 헬퍼 함수: 타입에 따라 엑셀 파일 쓰기
-def write_excel_file_by_type(df: pd.DataFrame, file_type: str):
+def write_excel_file_by_type(df: "pd.DataFrame", file_type: str):
     try:
         file_path_by_type = get_typed_file_path(file_type)
-        df.to_excel(file_path_by_type, index=False)
+        with metrics.EXCEL_IO_SECONDS.labels(operation="write", file_type=file_type).time():
+            df.to_excel(file_path_by_type, index=False)
         return True
     except Exception as e:
         print(f"Error writing to Excel file for type {file_type}: {e}")
@@ -97,6 +105,7 @@ def get_data_entries(file_type: str) -> Dict[str, Any]:
 
 # 3. 새 데이터 추가 로직 (file_type과 NewDataEntry/NewOAQnAEntry에 따라 분기)
 def add_data(entry: BaseModel, file_type: str): # BaseModel을 받아 유연하게
+    import pandas as pd
     df = read_excel_file_by_type(file_type)
     new_id = df['id'].max() + 1 if not df.empty and 'id' in df.columns else 1
     
@@ -0,0 +1,228 @@
+# models_ml/services/evaluation_manager.py
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import time
+from typing import Dict, Any, List, Optional
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from models_ml.inference import sql_execution
+from models_ml.shared_models import EvaluationRequest
+from models_ml.services import model_manager, data_manager, resource_scheduler, artifact_store, metrics
+
+# SQL 실행 워커 프로세스 수 (기본: CPU 코어 수)
+EVAL_WORKERS = int(os.environ.get("EVAL_WORKERS", str(os.cpu_count() or 1)))
+# 보고서에 남길 오답 예시 수
+EVAL_FAILURE_SAMPLES = int(os.environ.get("EVAL_FAILURE_SAMPLES", "20"))
+# 평가 보고서는 병합 모델 폴더 안에 저장합니다. (모델 삭제 시 함께 삭제)
+REPORT_PATH = os.path.join("evaluation", "execution_accuracy.json")
+
+# 이 프로세스에서 실행했거나 실행 중인 평가 상태: {job_id: {"status": ..., ...}}
+_evaluations: Dict[str, Dict[str, Any]] = {}
+
+def load_eval_rows(limit: Optional[int] = None) -> List[Dict[str, str]]:
+    """
+    text-to-sql 데이터에서 스키마와 정답 SQL이 모두 있는 행을 읽습니다.
+    """
+    df = data_manager.read_excel_file_by_type("text-to-sql")
+    rows = []
+    for record in df.to_dict(orient="records"):
+        if not str(record.get("schema", "")).strip() or not str(record.get("answer", "")).strip():
+            continue
+        rows.append({
+            "id": record.get("id"),
+            "question": str(record["question"]),
+            "answer": str(record["answer"]),
+            "schema": str(record["schema"]),
+        })
+        if limit and len(rows) >= limit:
+            break
+    return rows
+
+def report_path(merged_path: str) -> str:
+    return os.path.join(merged_path, REPORT_PATH)
+
+def run_execution_eval(model_path: str, rows: List[Dict[str, str]], request: EvaluationRequest) -> Dict[str, Any]:
+    """
+    모델을 한 번만 로드하여 모든 행의 SQL을 생성하고, 생성되는 대로 프로세스 풀에서 정답 SQL과 함께 실행해 비교합니다.
+    (스레드에서 실행: GPU 생성과 CPU SQL 실행이 겹쳐서 진행됩니다.)
+    """
+    from models_ml.inference import eval_data
+    import torch
+
+    timings = {}
+    start = time.perf_counter()
+    stats = {}
+    model, tokenizer = eval_data.load_model_and_tokenizer(
+        model_path, request.bnb_4bit_compute_dtype, request.quantization, stats
+    )
+    timings["model_load"] = time.perf_counter() - start
+
+    results = []
+    predictions = []
+    # torch/CUDA가 초기화된 프로세스를 fork하지 않도록 spawn으로 워커를 만듭니다. (워커는 sql_execution만 임포트)
+    mp_context = multiprocessing.get_context("spawn")
+
+    def new_pool():
+        return concurrent.futures.ProcessPoolExecutor(max_workers=max(1, EVAL_WORKERS), mp_context=mp_context)
+
+    def stop_pool(pool, terminate: bool):
+        for future in futures:
+            future.cancel()
+        if terminate:
+            # 멈춘 워커를 기다리지 않도록 워커 프로세스를 종료합니다.
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=not terminate)
+
+    pool = new_pool()
+    tasks = []
+    futures = []
+    try:
+        step = time.perf_counter()
+        for index, row in enumerate(rows):
+            prompt = eval_data.build_prompt(row["question"], row["schema"])
+            predicted = sql_execution.normalize_prediction(eval_data.generate_answer(model, tokenizer, prompt))
+            predictions.append(predicted)
+            tasks.append({
+                "index": index,
+                "schema": row["schema"],
+                "answer": row["answer"],
+                "predicted": predicted,
+                "synthetic_rows": request.synthetic_rows,
+                "seed": index,
+                "timeout_seconds": request.timeout_seconds,
+            })
+            futures.append(pool.submit(sql_execution.evaluate_row, tasks[-1]))
+        timings["generate"] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        for index in range(len(futures)):
+            try:
+                # 쿼리별 타임아웃은 워커 안에서 처리되므로, 여기서는 DB 생성까지 포함한 넉넉한 상한만 둡니다.
+                results.append(futures[index].result(timeout=request.timeout_seconds * 2 + 30))
+            except concurrent.futures.TimeoutError:
+                results.append({"index": index, "match": False, "status": "worker_timeout"})
+                # 멈춘 워커가 있는 풀을 버리고, 아직 결과가 없는 나머지 행은 새 풀에서 다시 실행합니다.
+                stop_pool(pool, terminate=True)
+                pool = new_pool()
+                for later in range(index + 1, len(futures)):
+                    future = futures[later]
+                    if future.done() and not future.cancelled() and future.exception() is None:
+                        continue
+                    futures[later] = pool.submit(sql_execution.evaluate_row, tasks[later])
+            except Exception as e:
+                # 워커가 죽으면(BrokenProcessPool) 남은 작업도 모두 여기로 옵니다. 행 단위 오류로 기록하고 계속합니다.
+                results.append({"index": index, "match": False, "status": "worker_error", "error": f"{type(e).__name__}: {e}"})
+        timings["execute_wait"] = time.perf_counter() - step
+    finally:
+        stop_pool(pool, terminate=False)
+        del model, tokenizer
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    timings["total"] = time.perf_counter() - start
+
+    report = sql_execution.summarize(results)
+    report.update({
+        "model_path": model_path,
+        "synthetic_rows": request.synthetic_rows,
+        "timeout_seconds": request.timeout_seconds,
+        "timings": timings,
+        "evaluated_at": datetime.datetime.now().isoformat(),
+        "failures": [
+            {
+                "id": rows[result["index"]]["id"],
+                "question": rows[result["index"]]["question"],
+                "answer": rows[result["index"]]["answer"],
+                "predicted": predictions[result["index"]],
+                "status": result["status"],
+                "error": result.get("error"),
+            }
+            for result in results if not result["match"]
+        ][:EVAL_FAILURE_SAMPLES],
+    })
+    return report
+
+async def prepare_evaluation(request: EvaluationRequest) -> Dict[str, Any]:
+    """
+    평가 요청을 검증하고 평가할 행을 읽습니다. 실제 평가는 run_evaluation이 백그라운드에서 실행합니다.
+    """
+    model = await model_manager.get_model(request.job_id)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Job ID '{request.job_id}'를 가진 모델을 찾을 수 없습니다.")
+    if model.status in ('failed', 'deleting'):
+        raise HTTPException(status_code=400, detail=f"'{model.status}' 상태의 모델은 평가할 수 없습니다.")
+    if _evaluations.get(request.job_id, {}).get("status") == "running":
+        raise HTTPException(status_code=409, detail=f"모델 '{request.job_id}'의 평가가 이미 진행 중입니다.")
+
+    # 데이터를 읽는 동안(await) 같은 모델의 평가 요청이 또 들어와도 409가 되도록 먼저 running으로 표시합니다.
+    previous = _evaluations.get(request.job_id)
+    _evaluations[request.job_id] = {"status": "running", "started_at": datetime.datetime.now().isoformat()}
+    try:
+        rows = await run_in_threadpool(load_eval_rows, request.limit)
+        if not rows:
+            raise HTTPException(status_code=400, detail="평가할 text-to-sql 데이터가 없습니다. 먼저 데이터를 업로드해주세요.")
+    except Exception:
+        # 평가를 시작하지 못했으므로 이전 상태(이전 평가 결과 등)로 되돌립니다.
+        if previous is None:
+            _evaluations.pop(request.job_id, None)
+        else:
+            _evaluations[request.job_id] = previous
+        raise
+    _evaluations[request.job_id]["rows"] = len(rows)
+    return {"request": request, "model_path": model.merged_path, "rows": rows}
+
+async def run_evaluation(plan: Dict[str, Any]):
+    """
+    실행 정확도 평가를 실행하고 결과를 레지스트리(execution_accuracy)와 보고서 파일에 기록합니다. (BackgroundTasks에서 실행)
+    """
+    request: EvaluationRequest = plan["request"]
+    model_path = plan["model_path"]
+    try:
+        # 모델을 올릴 메모리를 "batch" 우선순위로 예약 (대화형 추론이 먼저 배정받음)
+        device = resource_scheduler.default_device(use_cpu=bool(request.quantization))
+        memory_estimate = await run_in_threadpool(
+            resource_scheduler.estimate_inference_bytes, model_path, request.bnb_4bit_compute_dtype, request.quantization
+        )
+        async with resource_scheduler.scheduler.reserve("batch", device, memory_estimate, label=f"eval:{request.job_id}"):
+            with metrics.INFERENCE_IN_PROGRESS.labels(kind="evaluation").track_inprogress():
+                report = await run_in_threadpool(run_execution_eval, model_path, plan["rows"], request)
+
+        def save_report():
+            os.makedirs(os.path.dirname(report_path(model_path)), exist_ok=True)
+            # 병합 모델 폴더의 파일은 다른 작업과 하드링크로 공유될 수 있으므로 덮어쓰기 전에 분리합니다.
+            artifact_store.detach_file(report_path(model_path))
+            with open(report_path(model_path), "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        await run_in_threadpool(save_report)
+
+        await model_manager.set_execution_accuracy(request.job_id, report["execution_accuracy"])
+        _evaluations[request.job_id] = {"status": "completed", "report": report}
+        print(f"모델 '{request.job_id}' 실행 정확도 평가 완료: {report['execution_accuracy']} "
+              f"({report['matches']}/{report['evaluable']}, {report['timings']['total']:.1f}s)")
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        print(f"모델 '{request.job_id}' 실행 정확도 평가 중 오류 발생: {detail}")
+        _evaluations[request.job_id] = {"status": "failed", "error": detail}
+
+async def get_evaluation(job_id: str) -> Dict[str, Any]:
+    """
+    진행 중/최근 평가 상태를 반환합니다. 이 프로세스에서 실행한 기록이 없으면 저장된 보고서를 읽습니다.
+    """
+    if job_id in _evaluations:
+        return _evaluations[job_id]
+    model = await model_manager.get_model(job_id)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Job ID '{job_id}'를 가진 모델을 찾을 수 없습니다.")
+    path = report_path(model.merged_path)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"모델 '{job_id}'의 평가 결과가 없습니다.")
+
+    def read_report():
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"status": "completed", "report": await run_in_threadpool(read_report)}
@@ -1,10 +1,19 @@
 # models_ml/services/inference_manager.py
+import asyncio
+import os
 from fastapi import HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import Optional # Optional 임포트
 
-# 실제 추론 로직이 있는 eval_data.py의 run_inference 함수 임포트
-from models_ml.inference.eval_data import run_inference
+from fastapi.concurrency import run_in_threadpool
+
+from models_ml.shared_models import QuantizationMode
+from models_ml.services import model_manager, resource_scheduler, metrics, profiling_manager
+
+# 실제 추론 로직(eval_data.py, model_loader.py)은 torch/transformers를 임포트하므로
+# API 기동 시간을 줄이기 위해 처음 필요할 때 임포트합니다.
+# ML_WARMUP=1이면 앱 시작 직후 백그라운드 스레드에서 미리 임포트하여 첫 추론 지연을 줄입니다.
+ML_WARMUP = os.environ.get("ML_WARMUP", "0") == "1"
 
 # main.py의 Pydantic 모델과 동일하게 정의 (bnb_4bit_compute_dtype 추가)
 class InferenceRequest(BaseModel):
@@ -12,15 +21,97 @@ class InferenceRequest(BaseModel):
     question: str
     schema_info: Optional[str] = None
     bnb_4bit_compute_dtype: str = 'bfloat16' # ★★★ 이 줄을 추가합니다. ★★★
+    quantization: Optional[QuantizationMode] = None # 'int8'이면 GPU 없이 CPU 양자화 모델로 추론
+    draft_model_id: Optional[str] = None # 보조 생성용 드래프트 모델 (레지스트리 job_id 또는 모델 경로/ID)
+    prompt_lookup_num_tokens: Optional[int] = None # 프롬프트 n-gram 드래프트 토큰 수 (draft_model_id와 함께 쓸 수 없음)
+
+    @model_validator(mode="after")
+    def check_single_draft_method(self):
+        if self.draft_model_id and self.prompt_lookup_num_tokens:
+            raise ValueError("draft_model_id와 prompt_lookup_num_tokens는 동시에 사용할 수 없습니다.")
+        return self
 
-def get_inference_result(request_data: InferenceRequest):
+async def resolve_model_path(model_id: str) -> str:
+    """
+    레지스트리 job_id가 주어지면 병합 모델 경로로 바꿉니다. 그 외에는 그대로 반환합니다.
+    """
+    model = await model_manager.get_model(model_id)
+    if model is not None:
+        return model.merged_path
+    return model_id
+
+def estimate_request_bytes(request_data: InferenceRequest, draft_model_id: Optional[str]) -> Optional[int]:
+    """
+    대상 모델(+ 드래프트 모델)의 메모리 추정치. 대상 모델 크기를 모르면 None(스케줄러가 거절하지 않음)을 반환합니다.
+    """
+    memory_estimate = resource_scheduler.estimate_inference_bytes(
+        request_data.model_id, request_data.bnb_4bit_compute_dtype, request_data.quantization
+    )
+    if memory_estimate is not None and draft_model_id:
+        memory_estimate += resource_scheduler.estimate_inference_bytes(draft_model_id, request_data.bnb_4bit_compute_dtype) or 0
+    return memory_estimate
+
+async def get_inference_result(request_data: InferenceRequest, kind: str = "interactive"):
+    """
+    추론을 실행합니다. kind는 스케줄러 우선순위("interactive" 또는 "batch")입니다.
+    """
+    stats = {}
+    status = "error"
     try:
-        predicted_sql = run_inference(
-            model_id=request_data.model_id,
-            question=request_data.question,
-            schema=request_data.schema_info,
-            bnb_4bit_compute_dtype=request_data.bnb_4bit_compute_dtype # ★★★ 이 인자 전달 ★★★
-        )
-        return {"status": "success", "predicted_sql": predicted_sql}
+        from models_ml.inference.eval_data import run_inference
+        draft_model_id = await resolve_model_path(request_data.draft_model_id) if request_data.draft_model_id else None
+
+        # 모델을 올릴 메모리를 예약한 뒤 실행 (학습 등 다른 작업과 같은 장치에서 OOM이 나지 않도록)
+        device = resource_scheduler.default_device(use_cpu=bool(request_data.quantization))
+        memory_estimate = await run_in_threadpool(estimate_request_bytes, request_data, draft_model_id)
+        async with resource_scheduler.scheduler.reserve(kind, device, memory_estimate, label=request_data.model_id) as reservation:
+            stats["queue_wait_seconds"] = reservation["queue_wait_seconds"]
+            # 모델 로드와 생성은 이벤트 루프를 막지 않도록 스레드에서 실행
+            with metrics.INFERENCE_IN_PROGRESS.labels(kind=kind).track_inprogress():
+                predicted_sql = await run_in_threadpool(
+                    run_inference,
+                    model_id=request_data.model_id,
+                    question=request_data.question,
+                    schema=request_data.schema_info,
+                    bnb_4bit_compute_dtype=request_data.bnb_4bit_compute_dtype, # ★★★ 이 인자 전달 ★★★
+                    quantization=request_data.quantization,
+                    stats=stats,
+                    draft_model_id=draft_model_id,
+                    prompt_lookup_num_tokens=request_data.prompt_lookup_num_tokens
+                )
+        # run_inference는 실패 시 예외 대신 오류 메시지를 반환하므로 생성 단계까지 끝났는지로 판단
+        status = "success" if "generate_seconds" in stats else "error"
+        return {"status": "success", "predicted_sql": predicted_sql, "stats": stats}
+    except HTTPException as e:
+        status = "rejected" if e.status_code == 503 else "error"
+        raise e
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"추론 중 오류 발생: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"추론 중 오류 발생: {str(e)}")
+    finally:
+        metrics.INFERENCE_REQUESTS.labels(kind=kind, status=status).inc()
+        metrics.observe_inference_stats(stats)
+        profiling_manager.annotate(model_id=request_data.model_id, status=status, stats=stats)
+
+async def prefetch_registry_model(job_id: str):
+    """
+    배포된 모델의 샤드를 페이지 캐시에 미리 올려 첫 추론(콜드 스타트)의 로딩 시간을 줄입니다.
+    """
+    from models_ml.inference import model_loader
+    model = await model_manager.get_model(job_id)
+    if model is None or not model_loader.is_registry_model(model.merged_path):
+        return
+    try:
+        await run_in_threadpool(model_loader.prefetch_model, model.merged_path)
+    except Exception as e:
+        print(f"모델 프리페치 중 오류 발생: {e}")
+
+def _import_inference_modules():
+    from models_ml.inference import eval_data, model_loader # noqa: F401
+
+async def warmup_inference_modules():
+    """
+    ML_WARMUP이 설정된 경우 추론 모듈을 백그라운드에서 미리 임포트합니다. (앱 시작 시 호출, 기동을 기다리게 하지 않음)
+    """
+    if ML_WARMUP:
+        asyncio.get_running_loop().run_in_executor(None, _import_inference_modules)
+        print("추론 모듈 백그라운드 임포트 시작")
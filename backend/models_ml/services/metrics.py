@@ -0,0 +1,136 @@
+# models_ml/services/metrics.py
+import functools
+import os
+import sys
+import time
+from typing import Dict, Any, Optional
+
+import psutil
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Prometheus 지표 정의 (/metrics 엔드포인트에서 노출)
+# 관측 자체는 perf_counter 두 번과 카운터 증가뿐이므로 운영 환경에서 항상 켜 두어도 됩니다.
+
+# 모델 로드/디코딩은 수 초~수 분이 걸리므로 기본 버킷보다 넓게 잡습니다.
+INFERENCE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+TRAINING_BUCKETS = (60, 300, 600, 1800, 3600, 7200, 14400, 28800, 86400)
+IO_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# 추론 단계별 소요 시간 (stats 딕셔너리의 키 -> stage 라벨)
+INFERENCE_STAGES = {
+    "queue_wait_seconds": "queue_wait",
+    "tokenize_seconds": "tokenize",
+    "model_load_seconds": "model_load",
+    "prefill_seconds": "prefill",
+    "decode_seconds": "decode",
+    "detokenize_seconds": "detokenize",
+}
+
+INFERENCE_STAGE_SECONDS = Histogram(
+    "llm_inference_stage_seconds", "추론 단계별 소요 시간", ["stage"], buckets=INFERENCE_BUCKETS,
+)
+INFERENCE_REQUESTS = Counter(
+    "llm_inference_requests_total", "추론 요청 수", ["kind", "status"],
+)
+INFERENCE_NEW_TOKENS = Counter(
+    "llm_inference_generated_tokens_total", "생성된 토큰 수",
+)
+# 추론은 요청마다 모델을 로드하고 끝나면 해제하므로, 진행 중인 추론 수가 곧 추론용으로 올라가 있는 모델 수입니다.
+INFERENCE_IN_PROGRESS = Gauge(
+    "llm_inference_in_progress", "진행 중인 추론 작업 수 (모델 로드 포함)", ["kind"],
+)
+
+EXCEL_IO_SECONDS = Histogram(
+    "llm_excel_io_seconds", "data_manager 엑셀 파일 읽기/쓰기 시간", ["operation", "file_type"], buckets=IO_BUCKETS,
+)
+DB_CALL_SECONDS = Histogram(
+    "llm_db_call_seconds", "model_manager DB 호출 시간", ["operation"], buckets=IO_BUCKETS,
+)
+DB_CALL_ERRORS = Counter(
+    "llm_db_call_errors_total", "model_manager DB 호출 오류 수", ["operation"],
+)
+MODEL_LIST_CACHE_LOOKUPS = Counter(
+    "llm_model_list_cache_lookups_total", "모델 목록 캐시 조회 수", ["result"],
+)
+
+TRAINING_QUEUE_WAIT_SECONDS = Histogram(
+    "llm_training_queue_wait_seconds", "학습 작업이 메모리 예약을 기다린 시간", buckets=INFERENCE_BUCKETS,
+)
+TRAINING_JOB_SECONDS = Histogram(
+    "llm_training_job_seconds", "학습 작업(train_data.py 실행) 소요 시간", ["status"], buckets=TRAINING_BUCKETS,
+)
+TRAINING_JOBS_RUNNING = Gauge(
+    "llm_training_jobs_running", "실행 중인 학습 작업 수",
+)
+
+# 조회 시점에 갱신하는 게이지
+MODEL_LIST_CACHE_ENTRIES = Gauge("llm_model_list_cache_entries", "모델 목록 캐시 항목 수")
+MODEL_SIZE_CACHE_ENTRIES = Gauge("llm_model_size_cache_entries", "모델 크기 추정 캐시 항목 수")
+PROCESS_RSS_BYTES = Gauge("llm_process_resident_memory_bytes", "API 프로세스 RSS")
+GPU_ALLOCATED_BYTES = Gauge("llm_gpu_memory_allocated_bytes", "torch가 할당한 GPU 메모리", ["device"])
+SCHEDULER_CAPACITY_BYTES = Gauge("llm_scheduler_capacity_bytes", "스케줄러가 배정할 수 있는 장치 메모리", ["device"])
+SCHEDULER_RESERVED_BYTES = Gauge("llm_scheduler_reserved_bytes", "스케줄러에 예약된 장치 메모리", ["device"])
+SCHEDULER_WAITING = Gauge("llm_scheduler_waiting_requests", "메모리 예약을 기다리는 요청 수", ["kind"])
+
+_process = psutil.Process(os.getpid())
+
+def observe_inference_stats(stats: Dict[str, Any]):
+    """
+    inference_manager가 채운 추론 통계(stats)를 단계별 히스토그램에 기록합니다.
+    """
+    for key, stage in INFERENCE_STAGES.items():
+        value = stats.get(key)
+        if value is not None:
+            INFERENCE_STAGE_SECONDS.labels(stage=stage).observe(value)
+    if stats.get("new_tokens"):
+        INFERENCE_NEW_TOKENS.inc(stats["new_tokens"])
+
+def time_async(histogram: Histogram, errors: Optional[Counter] = None, **labels):
+    """
+    async 함수의 실행 시간을 기록하는 데코레이터입니다. (prometheus_client의 .time()은 코루틴을 지원하지 않음)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                # 404 등 클라이언트 오류(HTTPException 4xx)는 오류로 집계하지 않습니다.
+                if errors is not None and getattr(e, "status_code", 500) >= 500:
+                    errors.labels(**labels).inc()
+                raise
+            finally:
+                histogram.labels(**labels).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def refresh_gauges():
+    """
+    캐시 크기, 메모리 사용량, 스케줄러 예약 상태를 조회 시점 값으로 갱신합니다.
+    """
+    from models_ml.services import model_manager, resource_scheduler
+
+    MODEL_LIST_CACHE_ENTRIES.set(len(model_manager._model_list_cache))
+    MODEL_SIZE_CACHE_ENTRIES.set(resource_scheduler.model_size_cache_entries())
+    PROCESS_RSS_BYTES.set(_process.memory_info().rss)
+
+    # torch가 아직 로드되지 않았다면(추론 전) GPU 지표를 위해 임포트하지 않습니다.
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        for index in range(torch.cuda.device_count()):
+            GPU_ALLOCATED_BYTES.labels(device=f"cuda:{index}").set(torch.cuda.memory_allocated(index))
+
+    snapshot = resource_scheduler.scheduler.snapshot()
+    for device, usage in snapshot["devices"].items():
+        SCHEDULER_CAPACITY_BYTES.labels(device=device).set(usage["capacity_bytes"])
+        SCHEDULER_RESERVED_BYTES.labels(device=device).set(usage["reserved_bytes"])
+    for kind in resource_scheduler.PRIORITIES:
+        SCHEDULER_WAITING.labels(kind=kind).set(sum(1 for entry in snapshot["waiting"] if entry["kind"] == kind))
+
+def render_metrics():
+    """
+    Prometheus 텍스트 형식의 지표와 Content-Type을 반환합니다.
+    """
+    refresh_gauges()
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,245 @@
+# models_ml/services/profiling_manager.py
+import contextvars
+import cProfile
+import datetime
+import io
+import json
+import os
+import pstats
+import random
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+
+# 프로파일링 결과 저장 폴더 (모델 산출물과 함께 .gitignore 대상)
+TRACE_DIR = os.path.join("models_ml/outputs", "traces")
+# 보관할 최대 트레이스 수. 넘으면 오래된 것부터 삭제합니다.
+PROFILE_MAX_TRACES = int(os.environ.get("PROFILE_MAX_TRACES", "200"))
+# 프로파일링 대상 엔드포인트
+PROFILED_PATHS = ("/run_inference", "/start_training_test")
+# 요청 단위로 프로파일링을 켜는 헤더. "1"/"cprofile"이면 cProfile, "torch"면 모델 호출 구간을 torch profiler로 측정
+PROFILE_HEADER = "X-Profile"
+SUMMARY_LINES = 60
+
+# 관리자 토글 (/api/profiling/settings로 실행 중 변경 가능)
+# sample_rate=0.01이면 헤더가 없는 요청의 1%를 프로파일링합니다.
+_settings = {
+    "enabled": os.environ.get("PROFILE_ENABLED", "0") == "1",
+    "sample_rate": float(os.environ.get("PROFILE_SAMPLE_RATE", "0.0")),
+    "torch_profiler": os.environ.get("PROFILE_TORCH", "0") == "1",
+}
+
+TRACE_ID_PATTERN = re.compile(r"^[\w.-]+$")
+
+class ProfileSession:
+    """
+    프로파일링 중인 요청 하나의 상태. contextvar로 전달되므로 run_in_threadpool 안의 작업에서도 조회할 수 있습니다.
+    """
+
+    def __init__(self, endpoint: str, mode: str, reason: str):
+        self.trace_id = f"{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}-{uuid.uuid4().hex[:8]}"
+        self.endpoint = endpoint
+        self.mode = mode
+        self.reason = reason
+        self.started_at = time.time()
+        self.path = os.path.join(TRACE_DIR, self.trace_id)
+        self.files: List[str] = []
+        self.annotations: Dict[str, Any] = {}
+        os.makedirs(self.path, exist_ok=True)
+
+    @property
+    def use_torch(self) -> bool:
+        return self.mode == "torch"
+
+    def file_path(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def add_file(self, name: str):
+        if name not in self.files:
+            self.files.append(name)
+
+_current_session: contextvars.ContextVar = contextvars.ContextVar("profile_session", default=None)
+
+def current_session() -> Optional[ProfileSession]:
+    return _current_session.get()
+
+def annotate(**values):
+    """
+    현재 프로파일링 중인 요청의 메타데이터에 값을 추가합니다. (프로파일링 중이 아니면 무시)
+    """
+    session = current_session()
+    if session is not None:
+        session.annotations.update(values)
+
+def get_settings() -> Dict[str, Any]:
+    return dict(_settings)
+
+def update_settings(enabled: Optional[bool] = None, sample_rate: Optional[float] = None,
+                    torch_profiler: Optional[bool] = None) -> Dict[str, Any]:
+    if sample_rate is not None and not 0.0 <= sample_rate <= 1.0:
+        raise HTTPException(status_code=400, detail="sample_rate는 0과 1 사이여야 합니다.")
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if sample_rate is not None:
+        _settings["sample_rate"] = sample_rate
+    if torch_profiler is not None:
+        _settings["torch_profiler"] = torch_profiler
+    print(f"프로파일링 설정 변경: {_settings}")
+    return get_settings()
+
+def choose_mode(header_value: Optional[str]):
+    """
+    요청 헤더와 샘플링 설정으로 프로파일링 여부를 결정합니다. 반환값: (mode, reason) 또는 (None, None)
+    """
+    if header_value:
+        value = header_value.strip().lower()
+        if value in ("1", "true", "cprofile"):
+            return "cprofile", "header"
+        if value == "torch":
+            return "torch", "header"
+    if _settings["enabled"] and _settings["sample_rate"] > 0 and random.random() < _settings["sample_rate"]:
+        return ("torch" if _settings["torch_profiler"] else "cprofile"), "sampled"
+    return None, None
+
+def write_summary(prof_path: str) -> str:
+    """
+    cProfile 결과(.prof)에서 누적 시간 기준 상위 함수 목록을 텍스트로 저장합니다.
+    """
+    summary_path = f"{os.path.splitext(prof_path)[0]}.txt"
+    buffer = io.StringIO()
+    stats = pstats.Stats(prof_path, stream=buffer)
+    stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        f.write(buffer.getvalue())
+    return os.path.basename(summary_path)
+
+@contextmanager
+def profile_section(name: str):
+    """
+    현재 요청이 프로파일링 대상이면 블록을 cProfile로 측정하여 <name>.prof로 저장합니다.
+    cProfile은 호출한 스레드만 측정하므로, 실제 작업이 실행되는 스레드(run_in_threadpool 내부)에서 사용해야 합니다.
+    """
+    session = current_session()
+    if session is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(session.file_path(f"{name}.prof"))
+        session.add_file(f"{name}.prof")
+        session.annotations.setdefault("sections", {})[name] = time.perf_counter() - start
+
+@contextmanager
+def model_profile_section(name: str):
+    """
+    모델 호출 구간용 프로파일링. torch 모드면 torch profiler로 측정하여 Chrome 트레이스(<name>.torch.json)로 저장하고,
+    그 외에는 profile_section(cProfile)과 같습니다. 두 프로파일러를 겹치면 오버헤드가 커서 하나만 사용합니다.
+    """
+    session = current_session()
+    if session is None or not session.use_torch:
+        with profile_section(name):
+            yield
+        return
+    import torch
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    start = time.perf_counter()
+    with torch.profiler.profile(activities=activities) as profiler:
+        yield
+    session.annotations.setdefault("sections", {})[name] = time.perf_counter() - start
+    profiler.export_chrome_trace(session.file_path(f"{name}.torch.json"))
+    session.add_file(f"{name}.torch.json")
+    with open(session.file_path(f"{name}.torch.txt"), "w", encoding="utf-8") as f:
+        f.write(profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=SUMMARY_LINES))
+    session.add_file(f"{name}.torch.txt")
+
+def _prune_traces():
+    if not os.path.isdir(TRACE_DIR):
+        return
+    traces = sorted(name for name in os.listdir(TRACE_DIR) if os.path.isdir(os.path.join(TRACE_DIR, name)))
+    for name in traces[:max(0, len(traces) - PROFILE_MAX_TRACES)]:
+        shutil.rmtree(os.path.join(TRACE_DIR, name), ignore_errors=True)
+
+def finish_session(session: ProfileSession, status_code: int):
+    """
+    요약 텍스트와 메타데이터(meta.json)를 기록하고 보관 개수를 정리합니다.
+    """
+    for name in list(session.files):
+        if name.endswith(".prof") and os.path.exists(session.file_path(name)):
+            session.add_file(write_summary(session.file_path(name)))
+    meta = {
+        "trace_id": session.trace_id,
+        "endpoint": session.endpoint,
+        "mode": session.mode,
+        "reason": session.reason,
+        "started_at": datetime.datetime.fromtimestamp(session.started_at).isoformat(),
+        "duration_seconds": time.time() - session.started_at,
+        "status_code": status_code,
+        "files": sorted(name for name in session.files if os.path.exists(session.file_path(name))),
+        "annotations": session.annotations,
+    }
+    with open(session.file_path("meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False, default=str)
+    _prune_traces()
+    print(f"프로파일 저장: {session.path} ({meta['duration_seconds']:.2f}s, {', '.join(meta['files'])})")
+
+async def profiling_middleware(request: Request, call_next):
+    """
+    PROFILED_PATHS 요청 중 헤더로 요청했거나 샘플링된 요청에 프로파일링 세션을 붙입니다.
+    """
+    if request.url.path not in PROFILED_PATHS:
+        return await call_next(request)
+    mode, reason = choose_mode(request.headers.get(PROFILE_HEADER))
+    if mode is None:
+        return await call_next(request)
+
+    session = ProfileSession(request.url.path, mode, reason)
+    token = _current_session.set(session)
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["X-Profile-Trace-Id"] = session.trace_id
+        return response
+    finally:
+        _current_session.reset(token)
+        try:
+            await run_in_threadpool(finish_session, session, status_code)
+        except Exception as e:
+            print(f"프로파일 저장 중 오류 발생: {e}")
+
+def list_traces() -> List[Dict[str, Any]]:
+    """
+    저장된 트레이스 메타데이터를 최신순으로 반환합니다.
+    """
+    traces = []
+    if not os.path.isdir(TRACE_DIR):
+        return traces
+    for name in sorted(os.listdir(TRACE_DIR), reverse=True):
+        meta_path = os.path.join(TRACE_DIR, name, "meta.json")
+        if not os.path.exists(meta_path):
+            continue # 기록 중인 트레이스
+        with open(meta_path, encoding="utf-8") as f:
+            traces.append(json.load(f))
+    return traces
+
+def get_trace_file_path(trace_id: str, file_name: str) -> str:
+    # 경로 조작(../ 등)을 막기 위해 이름 형식을 검사합니다.
+    if not TRACE_ID_PATTERN.match(trace_id) or not TRACE_ID_PATTERN.match(file_name) or ".." in (trace_id + file_name):
+        raise HTTPException(status_code=400, detail="잘못된 트레이스 경로입니다.")
+    path = os.path.join(TRACE_DIR, trace_id, file_name)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"트레이스 파일을 찾을 수 없습니다: {trace_id}/{file_name}")
+    return path
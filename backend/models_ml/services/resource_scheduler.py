@@ -0,0 +1,268 @@
+# models_ml/services/resource_scheduler.py
+import asyncio
+import glob
+import importlib.util
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Dict, Any, Optional, List
+
+import psutil
+from fastapi import HTTPException
+
+# 작업 종류별 우선순위 (숫자가 작을수록 먼저 메모리를 배정받음)
+PRIORITIES = {
+    "interactive": 0, # /run_inference 등 사용자가 기다리는 추론
+    "batch": 1,       # 평가/벤치마크 등 일괄 추론
+    "training": 2,    # 학습 작업
+}
+
+# 장치 메모리 중 스케줄러가 배정할 수 있는 비율 (CUDA 컨텍스트, 단편화 등 여유분 제외)
+SCHEDULER_MEMORY_FRACTION = float(os.environ.get("SCHEDULER_MEMORY_FRACTION", "0.9"))
+# 장치 용량을 직접 지정할 때 사용 (GB). 지정하지 않으면 자동 감지합니다.
+SCHEDULER_GPU_MEMORY_GB = os.environ.get("SCHEDULER_GPU_MEMORY_GB")
+SCHEDULER_HOST_MEMORY_GB = os.environ.get("SCHEDULER_HOST_MEMORY_GB")
+# 모델 크기를 알 수 없을 때 예약하는 메모리 (GB). 크기를 모르는 요청은 거절하지 않고 이 값(장치 용량 이내)만큼 예약합니다.
+# 기본값은 7B 모델을 bf16으로 올릴 수 있는 크기로, 크기를 모르는 작업끼리 같은 장치에 겹쳐 OOM이 나지 않도록 보수적으로 잡습니다.
+# 크기를 모르는 학습(training)은 이 값 대신 장치 전체를 예약하여 다른 작업과 동시에 실행되지 않습니다.
+SCHEDULER_UNKNOWN_MODEL_GB = float(os.environ.get("SCHEDULER_UNKNOWN_MODEL_GB", "16"))
+# Hub 모델 크기 조회(백그라운드) 타임아웃 (초)
+SCHEDULER_HUB_LOOKUP_TIMEOUT = float(os.environ.get("SCHEDULER_HUB_LOOKUP_TIMEOUT", "10"))
+
+GB = 1024 ** 3
+
+def _detect_gpu_memory() -> int:
+    if importlib.util.find_spec("torch") is None:
+        return 0
+    import torch
+    if not torch.cuda.is_available():
+        return 0
+    return sum(torch.cuda.mem_get_info(index)[1] for index in range(torch.cuda.device_count()))
+
+def detect_capacity(device: str) -> int:
+    """
+    장치의 총 메모리 중 스케줄러가 배정할 수 있는 바이트 수를 반환합니다.
+    "cuda"는 보이는 모든 GPU의 합(device_map="auto"로 여러 GPU에 나뉘어 올라가므로), "cpu"는 호스트 메모리입니다.
+    """
+    if device == "cuda":
+        if SCHEDULER_GPU_MEMORY_GB:
+            return int(float(SCHEDULER_GPU_MEMORY_GB) * GB)
+        return int(_detect_gpu_memory() * SCHEDULER_MEMORY_FRACTION)
+    if SCHEDULER_HOST_MEMORY_GB:
+        return int(float(SCHEDULER_HOST_MEMORY_GB) * GB)
+    return int(psutil.virtual_memory().total * SCHEDULER_MEMORY_FRACTION)
+
+def default_device(use_cpu: bool = False) -> str:
+    if use_cpu or scheduler.capacity("cuda") == 0:
+        return "cpu"
+    return "cuda"
+
+# Hub 모델 크기 조회 결과 {model_id: 바이트 수 또는 None(조회 실패)}. 조회는 요청 경로 밖의 스레드에서 합니다.
+_hub_model_bytes: Dict[str, Optional[int]] = {}
+_hub_lookups_started = set()
+_hub_lookup_lock = threading.Lock()
+
+@lru_cache(maxsize=128)
+def _local_model_bytes(model_dir: str) -> Optional[int]:
+    weight_files = glob.glob(os.path.join(model_dir, "*.safetensors"))
+    if not weight_files:
+        return None
+    return sum(os.path.getsize(path) for path in weight_files)
+
+def _cached_hub_model_bytes(model_id: str) -> Optional[int]:
+    """
+    로컬 Hugging Face 캐시에 이미 받아 둔 safetensors 파일로 크기를 계산합니다. (네트워크 사용 없음)
+    """
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return None
+    index_path = try_to_load_from_cache(model_id, "model.safetensors.index.json")
+    if isinstance(index_path, str):
+        with open(index_path, encoding="utf-8") as f:
+            total_size = json.load(f).get("metadata", {}).get("total_size")
+        if total_size:
+            return int(total_size)
+    weights_path = try_to_load_from_cache(model_id, "model.safetensors")
+    if isinstance(weights_path, str):
+        return os.path.getsize(weights_path)
+    return None
+
+def _lookup_hub_model_bytes(model_id: str):
+    size = None
+    try:
+        from huggingface_hub import HfApi
+        info = HfApi().model_info(model_id, timeout=SCHEDULER_HUB_LOOKUP_TIMEOUT)
+        if info.safetensors is not None:
+            size = int(info.safetensors.total * 2) # 파라미터 수 x 16bit
+    except Exception as e:
+        print(f"모델 크기 조회 실패 ({model_id}): {e}")
+    _hub_model_bytes[model_id] = size
+
+def _start_hub_lookup(model_id: str):
+    with _hub_lookup_lock:
+        if model_id in _hub_lookups_started:
+            return
+        _hub_lookups_started.add(model_id)
+    threading.Thread(target=_lookup_hub_model_bytes, args=(model_id,), daemon=True).start()
+
+def estimate_model_bytes(model_id: str) -> Optional[int]:
+    """
+    모델 가중치 크기를 추정합니다. 알 수 없으면 None을 반환합니다.
+    - 로컬 폴더: safetensors 파일 크기의 합
+    - Hub 모델: 로컬 캐시의 safetensors 크기, 없으면 백그라운드 Hub 조회 결과(파라미터 수 x 16bit)
+      첫 요청은 조회를 시작만 하고 None을 반환하므로 요청 경로에서 네트워크를 기다리지 않습니다.
+    """
+    if os.path.isdir(model_id):
+        return _local_model_bytes(model_id)
+    if model_id in _hub_model_bytes:
+        return _hub_model_bytes[model_id]
+    size = _cached_hub_model_bytes(model_id)
+    if size is not None:
+        _hub_model_bytes[model_id] = size
+        return size
+    _start_hub_lookup(model_id)
+    return None
+
+def model_size_cache_entries() -> int:
+    return _local_model_bytes.cache_info().currsize + len(_hub_model_bytes)
+
+def estimate_inference_bytes(model_id: str, bnb_4bit_compute_dtype: str = 'bfloat16',
+                             quantization: Optional[str] = None) -> Optional[int]:
+    """
+    추론 시 필요한 메모리 추정치: 가중치(로드 dtype 기준) + KV 캐시/활성값 여유분 20%.
+    가중치 파일은 16bit로 저장되어 있다고 가정합니다. 모델 크기를 모르면 None입니다.
+    """
+    weights = estimate_model_bytes(model_id)
+    if weights is None:
+        return None
+    if quantization == "int8":
+        weights = weights // 2
+    elif bnb_4bit_compute_dtype == "float32":
+        weights = weights * 2
+    return int(weights * 1.2)
+
+def estimate_training_bytes(model_id: str, load_in_4bit: bool = True, use_cpu: bool = False,
+                            num_workers: int = 1, per_device_train_batch_size: int = 1) -> Optional[int]:
+    """
+    학습 시 필요한 메모리 추정치.
+    4-bit(QLoRA)면 가중치가 약 1/4, 여기에 LoRA 옵티마이저 상태/활성값 여유분을 더합니다.
+    데이터 병렬 워커는 각자 모델 전체를 올리므로 워커 수만큼 곱합니다. 모델 크기를 모르면 None입니다.
+    """
+    weights = estimate_model_bytes(model_id)
+    if weights is None:
+        return None
+    if load_in_4bit and not use_cpu:
+        weights = weights // 4
+    per_worker = weights * 1.5 + per_device_train_batch_size * 2 * GB
+    return int(per_worker * max(1, num_workers))
+
+class ResourceScheduler:
+    """
+    학습, 일괄 추론, 대화형 추론이 같은 장치에서 메모리를 초과하지 않도록 예약을 관리합니다.
+    - 예약은 장치별 용량 안에서만 허용되고, 넘치면 대기합니다.
+    - 대기 중인 요청은 (우선순위, 도착 순서)로 정렬되어 앞선 요청부터 배정됩니다.
+      따라서 대화형 추론은 대기 중인 학습보다 먼저 메모리를 받습니다.
+    """
+
+    def __init__(self):
+        self._capacity: Dict[str, int] = {}
+        self._allocations: Dict[int, Dict[str, Any]] = {}
+        self._waiting: Dict[int, Dict[str, Any]] = {}
+        self._sequence = itertools.count(1)
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # 이벤트 루프 안에서 생성 (Python 3.8 호환)
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def capacity(self, device: str) -> int:
+        if device not in self._capacity:
+            self._capacity[device] = detect_capacity(device)
+        return self._capacity[device]
+
+    def reserved(self, device: str) -> int:
+        return sum(entry["bytes"] for entry in self._allocations.values() if entry["device"] == device)
+
+    def _is_next(self, entry: Dict[str, Any]) -> bool:
+        ahead = [
+            other for other in self._waiting.values()
+            if other["device"] == entry["device"]
+            and (other["priority"], other["id"]) < (entry["priority"], entry["id"])
+        ]
+        return not ahead and self.reserved(entry["device"]) + entry["bytes"] <= self.capacity(entry["device"])
+
+    @asynccontextmanager
+    async def reserve(self, kind: str, device: str, nbytes: Optional[int], label: str = ""):
+        """
+        메모리를 예약하고, 블록이 끝나면 해제합니다.
+        nbytes가 None(크기를 모름)이면 거절하지 않고 SCHEDULER_UNKNOWN_MODEL_GB만큼(장치 용량 이내) 예약합니다.
+        크기를 모르는 training은 장치 전체를 예약합니다.
+        사용 예: async with scheduler.reserve("interactive", "cuda", nbytes, label) as reservation: ...
+        """
+        if kind not in PRIORITIES:
+            raise ValueError(f"알 수 없는 작업 종류입니다: {kind}")
+        capacity = self.capacity(device)
+        estimated = nbytes is not None
+        if not estimated:
+            nbytes = capacity if kind == "training" else min(int(SCHEDULER_UNKNOWN_MODEL_GB * GB), capacity)
+        elif nbytes > capacity:
+            raise HTTPException(
+                status_code=503,
+                detail=f"예상 메모리({nbytes / GB:.1f}GB)가 장치 '{device}'의 용량({capacity / GB:.1f}GB)을 초과합니다.",
+            )
+
+        entry = {
+            "id": next(self._sequence),
+            "kind": kind,
+            "priority": PRIORITIES[kind],
+            "device": device,
+            "bytes": int(nbytes),
+            "estimated": estimated,
+            "label": label,
+            "requested_at": time.time(),
+        }
+        condition = self._get_condition()
+        wait_start = time.perf_counter()
+        async with condition:
+            self._waiting[entry["id"]] = entry
+            try:
+                await condition.wait_for(lambda: self._is_next(entry))
+            finally:
+                del self._waiting[entry["id"]]
+                # 대기열 순서가 바뀌었으므로 다른 대기자도 다시 확인하도록 깨웁니다.
+                condition.notify_all()
+            entry["queue_wait_seconds"] = time.perf_counter() - wait_start
+            entry["granted_at"] = time.time()
+            self._allocations[entry["id"]] = entry
+        try:
+            yield entry
+        finally:
+            async with condition:
+                self._allocations.pop(entry["id"], None)
+                condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        devices = {}
+        for device in sorted(set(self._capacity) | {entry["device"] for entry in self._allocations.values()}):
+            capacity = self.capacity(device)
+            reserved = self.reserved(device)
+            devices[device] = {"capacity_bytes": capacity, "reserved_bytes": reserved, "free_bytes": capacity - reserved}
+
+        def public(entries: List[Dict[str, Any]]):
+            return [{key: value for key, value in entry.items() if key != "priority"} for entry in entries]
+
+        return {
+            "devices": devices,
+            "allocations": public(sorted(self._allocations.values(), key=lambda entry: entry["id"])),
+            "waiting": public(sorted(self._waiting.values(), key=lambda entry: (entry["priority"], entry["id"]))),
+        }
+
+# 프로세스 전체에서 공유하는 스케줄러
+scheduler = ResourceScheduler()
@@ -0,0 +1,220 @@
+# models_ml/services/storage_manager.py
+import asyncio
+import os
+import re
+import shutil
+import time
+from typing import Dict, Any, List, Iterable
+
+from fastapi.concurrency import run_in_threadpool
+
+from models_ml.services import model_manager, artifact_store
+
+# 모델 저장 디렉토리 (training_manager와 동일)
+OUTPUT_BASE_DIR = "models_ml/outputs"
+ARTIFACT_SUBDIRS = ("adapters", "merged")
+
+# GC 보존 정책 (환경 변수로 조정)
+# - 등록된 모델의 어댑터 폴더에 남겨 둘 중간 체크포인트(checkpoint-*) 개수
+GC_CHECKPOINT_RETENTION = int(os.environ.get("GC_CHECKPOINT_RETENTION", "0"))
+# - DB에 없는 폴더를 고아로 판단하기 전까지 기다리는 시간 (학습 중인 다른 워커의 폴더 보호)
+GC_ORPHAN_MIN_AGE_HOURS = float(os.environ.get("GC_ORPHAN_MIN_AGE_HOURS", "24"))
+# - 실패한 학습의 산출물을 보관하는 시간 (DB 행은 이력으로 남김)
+GC_FAILED_RETENTION_HOURS = float(os.environ.get("GC_FAILED_RETENTION_HOURS", "72"))
+# - 주기적 GC 실행 간격(초). 0이면 주기 실행을 하지 않고 /api/storage/gc 호출로만 실행합니다.
+GC_INTERVAL_SECONDS = float(os.environ.get("GC_INTERVAL_SECONDS", "0"))
+
+CHECKPOINT_DIR_PATTERN = re.compile(r"^checkpoint-(\d+)$")
+
+# 이 프로세스에서 학습 중인 job_id. 학습 중인 폴더는 DB에 아직 없으므로 GC 대상에서 제외합니다.
+_running_jobs = set()
+_gc_lock = None
+_gc_task = None
+
+def mark_job_started(job_id: str):
+    _running_jobs.add(job_id)
+
+def mark_job_finished(job_id: str):
+    _running_jobs.discard(job_id)
+
+def directory_size(path: str) -> int:
+    """
+    폴더를 삭제했을 때 실제로 회수되는 크기(바이트)를 계산합니다.
+    폴더 밖(다른 작업 폴더나 아티팩트 저장소)에서도 하드링크로 참조하는 파일은 제외합니다.
+    """
+    links_in_tree = {}
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            key = (stat.st_dev, stat.st_ino)
+            count, _, _ = links_in_tree.get(key, (0, stat.st_nlink, stat.st_size))
+            links_in_tree[key] = (count + 1, stat.st_nlink, stat.st_size)
+    return sum(size for count, nlink, size in links_in_tree.values() if count >= nlink)
+
+def remove_paths(paths: Iterable[str], dry_run: bool = False) -> int:
+    """
+    주어진 폴더들을 삭제하고 실제로 회수한 바이트 수를 반환합니다.
+    삭제에 실패한 폴더는 남은 크기를 빼고 집계하며, 나머지 폴더의 삭제는 계속 진행합니다.
+    """
+    reclaimed = 0
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        size = directory_size(path)
+        if not dry_run:
+            try:
+                shutil.rmtree(path)
+            except OSError as e:
+                print(f"폴더 삭제 실패: {path} ({e})")
+            if os.path.exists(path):
+                size -= directory_size(path)
+        reclaimed += size
+        print(f"{'[dry-run] ' if dry_run else ''}폴더 삭제: {path} ({size} bytes)")
+    return reclaimed
+
+def _is_older_than(path: str, hours: float) -> bool:
+    try:
+        return time.time() - os.path.getmtime(path) >= hours * 3600
+    except OSError:
+        return False
+
+def _stale_checkpoints(adapter_path: str, retention: int) -> List[str]:
+    """
+    어댑터 폴더의 checkpoint-* 중 최신 retention개를 제외한 나머지 경로를 반환합니다.
+    """
+    if not os.path.isdir(adapter_path):
+        return []
+    checkpoints = []
+    for name in os.listdir(adapter_path):
+        match = CHECKPOINT_DIR_PATTERN.match(name)
+        if match and os.path.isdir(os.path.join(adapter_path, name)):
+            checkpoints.append((int(match.group(1)), os.path.join(adapter_path, name)))
+    checkpoints.sort()
+    if retention > 0:
+        checkpoints = checkpoints[:-retention]
+    return [path for _, path in checkpoints]
+
+def _find_orphans(known_paths: set) -> List[str]:
+    orphans = []
+    for subdir in ARTIFACT_SUBDIRS:
+        base_dir = os.path.join(OUTPUT_BASE_DIR, subdir)
+        if not os.path.isdir(base_dir):
+            continue
+        for name in os.listdir(base_dir):
+            path = os.path.join(base_dir, name)
+            if not os.path.isdir(path) or name in _running_jobs:
+                continue
+            if os.path.abspath(path) in known_paths:
+                continue
+            if _is_older_than(path, GC_ORPHAN_MIN_AGE_HOURS):
+                orphans.append(path)
+    return orphans
+
+async def reclaim_model(job_id: str) -> int:
+    """
+    'deleting' 상태인 모델의 폴더를 삭제한 뒤 DB 행을 제거합니다. (BackgroundTasks에서 실행)
+    도중에 실패하면 행이 'deleting' 상태로 남아 다음 GC 때 다시 처리됩니다.
+    """
+    model = await model_manager.get_model(job_id)
+    if model is None or model.status != 'deleting':
+        return 0
+    try:
+        paths = [model.adapter_path, model.merged_path]
+        reclaimed = await run_in_threadpool(remove_paths, paths)
+        # 이 모델만 참조하던 블롭도 함께 정리
+        reclaimed += await run_in_threadpool(artifact_store.prune_blobs)
+        remaining = [path for path in paths if path and os.path.exists(path)]
+        if remaining:
+            print(f"모델 '{job_id}' 폴더가 남아 있어 다음 GC 때 다시 삭제합니다: {remaining} ({reclaimed} bytes 회수)")
+            return reclaimed
+        await model_manager.purge_model(job_id)
+        print(f"모델 '{job_id}' 삭제 완료: {reclaimed} bytes 회수")
+        return reclaimed
+    except Exception as e:
+        print(f"모델 '{job_id}' 백그라운드 삭제 중 오류 발생: {e}")
+        return 0
+
+async def run_gc(dry_run: bool = False) -> Dict[str, Any]:
+    """
+    OUTPUT_BASE_DIR과 레지스트리(TrainedModelDB)를 대조하여 디스크를 정리합니다.
+    1) 삭제가 끝나지 않은 'deleting' 모델 재처리
+    2) DB에 없는 고아 폴더 삭제
+    3) 보존 기간이 지난 실패 학습 산출물 삭제
+    4) 등록된 모델의 중간 체크포인트 정리
+    5) 더 이상 참조되지 않는 아티팩트 블롭 정리
+    """
+    global _gc_lock
+    if _gc_lock is None:
+        _gc_lock = asyncio.Lock() # 이벤트 루프 안에서 생성 (Python 3.8 호환)
+    async with _gc_lock:
+        models = await model_manager.get_all_models()
+        known_paths = set()
+        pending_deletes = []
+        failed_paths = []
+        checkpoint_roots = []
+        for model in models:
+            known_paths.add(os.path.abspath(model.adapter_path))
+            known_paths.add(os.path.abspath(model.merged_path))
+            if model.status == 'deleting':
+                pending_deletes.append(model.job_id)
+            elif model.status == 'failed':
+                failed_paths.extend(
+                    path for path in (model.adapter_path, model.merged_path)
+                    if os.path.exists(path) and _is_older_than(path, GC_FAILED_RETENTION_HOURS)
+                )
+            else:
+                checkpoint_roots.append(model.adapter_path)
+
+        def sweep():
+            orphans = _find_orphans(known_paths)
+            checkpoints = [
+                path for root in checkpoint_roots
+                for path in _stale_checkpoints(root, GC_CHECKPOINT_RETENTION)
+            ]
+            swept = {
+                "orphans": (orphans, remove_paths(orphans, dry_run)),
+                "failed": (failed_paths, remove_paths(failed_paths, dry_run)),
+                "checkpoints": (checkpoints, remove_paths(checkpoints, dry_run)),
+            }
+            # dry-run에서는 위 폴더가 실제로 지워지지 않으므로 블롭 회수량은 현재 기준으로만 보고됩니다.
+            swept["blobs"] = ([], artifact_store.prune_blobs(dry_run))
+            return swept
+
+        swept = await run_in_threadpool(sweep)
+
+        reclaimed_deletes = 0
+        if not dry_run:
+            for job_id in pending_deletes:
+                reclaimed_deletes += await reclaim_model(job_id)
+
+        report = {
+            "dry_run": dry_run,
+            "removed": {category: paths for category, (paths, _) in swept.items()},
+            "reclaimed_bytes_by_category": {category: size for category, (_, size) in swept.items()},
+            "pending_deletes": pending_deletes,
+            "artifact_store": artifact_store.store_stats(),
+        }
+        report["reclaimed_bytes_by_category"]["pending_deletes"] = reclaimed_deletes
+        report["reclaimed_bytes"] = sum(report["reclaimed_bytes_by_category"].values())
+        print(f"GC 완료: {report['reclaimed_bytes']} bytes 회수 (dry_run={dry_run})")
+        return report
+
+async def _gc_loop():
+    while True:
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
+        try:
+            await run_gc()
+        except Exception as e:
+            print(f"주기적 GC 실행 중 오류 발생: {e}")
+
+async def start_gc_sweeper():
+    """
+    GC_INTERVAL_SECONDS가 설정된 경우 주기적으로 GC를 실행하는 백그라운드 작업을 시작합니다. (앱 시작 시 호출)
+    """
+    global _gc_task
+    if GC_INTERVAL_SECONDS > 0 and _gc_task is None:
+        _gc_task = asyncio.create_task(_gc_loop())
+        print(f"GC 스위퍼 시작: {GC_INTERVAL_SECONDS}초 간격")
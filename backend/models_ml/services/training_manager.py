@@ -3,12 +3,13 @@ import subprocess
 import os
 import datetime
 import re
-from huggingface_hub import login
+import time
 from fastapi import HTTPException
 # from pydantic import BaseModel
 from fastapi.responses import JSONResponse
 from models_ml.shared_models import TrainingRequest, HuggingFaceLoginRequest, ModelEntryResponse, RegisterModelRequest # ★★★ 이 줄을 추가합니다. ★★★
-from models_ml.services import model_manager, data_manager
+from fastapi.concurrency import run_in_threadpool
+from models_ml.services import model_manager, data_manager, storage_manager, artifact_store, resource_scheduler, metrics, profiling_manager
 
 # training/train_data.py 스크립트의 경로를 지정합니다.
 TRAIN_DATA_SCRIPT_PATH = "models_ml/training/train_data.py"
@@ -39,11 +40,50 @@ OUTPUT_BASE_DIR = "models_ml/outputs"
 os.makedirs(os.path.join(OUTPUT_BASE_DIR, "adapters"), exist_ok=True)
 os.makedirs(os.path.join(OUTPUT_BASE_DIR, "merged"), exist_ok=True)
 
+def build_launch_prefix(num_workers: int) -> list:
+    """
+    학습 스크립트 실행 명령의 앞부분을 만듭니다.
+    워커가 2개 이상이면 torch.distributed.run(torchrun)으로 num_workers개의 프로세스를 띄워 데이터 병렬 학습을 합니다.
+    """
+    if num_workers <= 1:
+        return ["python3"]
+    return [
+        "python3", "-m", "torch.distributed.run",
+        "--standalone",                     # 단일 노드 (멀티 노드는 --nnodes/--rdzv_endpoint로 확장)
+        "--nproc_per_node", str(num_workers),
+    ]
+
+def build_profile_args(num_workers: int) -> list:
+    """
+    프로파일링 중인 요청이면 학습 스크립트를 python -m cProfile로 실행하여 결과를 트레이스 폴더에 저장합니다.
+    데이터 병렬(워커 2개 이상) 실행은 프로세스마다 결과가 나뉘므로 프로파일링하지 않습니다.
+    """
+    session = profiling_manager.current_session()
+    if session is None:
+        return []
+    if num_workers > 1:
+        profiling_manager.annotate(training_profile="skipped: num_workers > 1")
+        return []
+    session.add_file("train_data.prof")
+    return ["-m", "cProfile", "-o", session.file_path("train_data.prof")]
+
+def build_launch_env(num_workers: int) -> dict:
+    """
+    학습 프로세스 환경 변수를 만듭니다.
+    torchrun은 워커가 여러 개일 때 OMP_NUM_THREADS를 1로 설정하므로, CPU 코어를 워커 수로 나누어 명시적으로 지정합니다.
+    """
+    env = os.environ.copy()
+    if num_workers > 1 and "OMP_NUM_THREADS" not in env:
+        env["OMP_NUM_THREADS"] = str(max(1, (os.cpu_count() or 1) // num_workers))
+    return env
+
 async def start_training(request_data: TrainingRequest):
     """
     학습 프로세스를 시작하고 로그를 반환합니다.
     """
     job_id = None
+    training_status = "failed"
+    launched = False # 학습 프로세스를 실행했는지 여부 (이후의 오류는 학습 산출물을 건드리지 않음)
     try:
         data_file_path = data_manager.get_typed_file_path(request_data.file_type)
 
@@ -53,6 +93,7 @@ async def start_training(request_data: TrainingRequest):
         # 모델 저장 경로 동적으로 생성
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         job_id = f"job-{timestamp}"
+        storage_manager.mark_job_started(job_id) # 학습 중인 폴더가 GC에 삭제되지 않도록 표시
         adapter_output_dir = os.path.join(OUTPUT_BASE_DIR, "adapters", job_id)
         merged_output_dir = os.path.join(OUTPUT_BASE_DIR, "merged", job_id)
         
@@ -61,8 +102,7 @@ async def start_training(request_data: TrainingRequest):
 
         # models_ml/training/train_data.py로 스크립트 경로 변경
         # 모든 학습 파라미터를 명령줄 인자로 전달
-        command = [
-            "python3",
+        command = build_launch_prefix(request_data.num_workers) + build_profile_args(request_data.num_workers) + [
             TRAIN_DATA_SCRIPT_PATH,
             "--model_id", request_data.model_id,
             "--system_message", request_data.system_message,
@@ -82,17 +122,49 @@ async def start_training(request_data: TrainingRequest):
             "--learning_rate", str(request_data.learning_rate),
             "--lr_scheduler_type", request_data.lr_scheduler_type,
             "--optim", request_data.optim,
+            "--use_cpu", str(request_data.use_cpu),
         ]
 
         print(f"Executing training command: {' '.join(command)}")
 
-        # subprocess.run을 사용하여 외부 스크립트 실행 (완료까지 대기)
-        process = subprocess.run(
-            command,
-            capture_output=True, # 표준 출력 및 에러를 캡처
-            text=True,           # 출력을 텍스트로 디코딩
-            check=True           # 에러 발생 시 CalledProcessError 예외 발생
-        )
+        # 학습에 필요한 메모리를 스케줄러에 예약 (용량이 생길 때까지 대기, 대화형 추론이 우선)
+        device = resource_scheduler.default_device(request_data.use_cpu)
+        if request_data.memory_estimate_gb:
+            memory_estimate = int(request_data.memory_estimate_gb * resource_scheduler.GB)
+        else:
+            memory_estimate = await run_in_threadpool(
+                resource_scheduler.estimate_training_bytes,
+                request_data.model_id,
+                request_data.load_in_4bit,
+                request_data.use_cpu,
+                request_data.num_workers,
+                request_data.per_device_train_batch_size,
+            )
+
+        async with resource_scheduler.scheduler.reserve("training", device, memory_estimate, label=job_id) as reservation:
+            metrics.TRAINING_QUEUE_WAIT_SECONDS.observe(reservation["queue_wait_seconds"])
+            metrics.TRAINING_JOBS_RUNNING.inc()
+            training_start = time.perf_counter()
+            try:
+                # subprocess.run을 사용하여 외부 스크립트 실행 (완료까지 대기)
+                # 학습 중에도 다른 요청을 처리할 수 있도록 스레드에서 실행
+                launched = True
+                process = await run_in_threadpool(
+                    subprocess.run,
+                    command,
+                    capture_output=True, # 표준 출력 및 에러를 캡처
+                    text=True,           # 출력을 텍스트로 디코딩
+                    check=True,          # 에러 발생 시 CalledProcessError 예외 발생
+                    env=build_launch_env(request_data.num_workers)
+                )
+                training_status = "completed"
+            finally:
+                # 학습 시간 지표에는 프로세스 실행 시간만 포함합니다. (이후 아티팩트 등록/DB 기록 제외)
+                training_seconds = time.perf_counter() - training_start
+                metrics.TRAINING_JOBS_RUNNING.dec()
+                metrics.TRAINING_JOB_SECONDS.labels(status=training_status).observe(training_seconds)
+        profiling_manager.annotate(job_id=job_id, queue_wait_seconds=reservation["queue_wait_seconds"],
+                                   training_seconds=training_seconds)
         logs = process.stdout + process.stderr # 표준 출력과 에러를 모두 캡처
 
         # ★★★ 학습 완료 후 로그 파싱 및 DB 등록 ★★★
@@ -110,8 +182,15 @@ async def start_training(request_data: TrainingRequest):
         if loss_match:
             eval_loss = float(loss_match.group(1))
 
+        # 산출물을 내용 주소 기반 저장소에 등록하여 다른 작업과 같은 파일(토크나이저, 동일 샤드 등)을 하드링크로 공유
+        try:
+            dedup_stats = await run_in_threadpool(artifact_store.ingest_directories, [adapter_output_dir, merged_output_dir])
+            print(f"아티팩트 중복 제거 결과: {dedup_stats}")
+        except Exception as store_e:
+            print(f"아티팩트 저장소 등록 중 오류 발생 (학습 결과에는 영향 없음): {store_e}")
+
         # DB에 모델 정보 등록
-        model_manager.register_trained_model(
+        await model_manager.register_trained_model(
             RegisterModelRequest(
                 job_id=job_id,
                 base_model_id=request_data.model_id,
@@ -135,7 +214,7 @@ async def start_training(request_data: TrainingRequest):
         print(f"Subprocess error: {error_output}")
         if job_id: # job_id가 생성된 경우에만 시도
              try:
-                 model_manager.register_trained_model(
+                 await model_manager.register_trained_model(
                      RegisterModelRequest(
                          job_id=job_id, # job_id를 사용하여 기존 레코드 업데이트 또는 새 레코드 추가
                          base_model_id=request_data.model_id,
@@ -155,13 +234,23 @@ async def start_training(request_data: TrainingRequest):
             raise HTTPException(status_code=500, detail=f"학습 실패: 설정값 오류 또는 데이터 문제. {error_output}")
         else:
             raise HTTPException(status_code=500, detail=f"학습 중 예기치 않은 오류 발생: {error_output}")
+    except HTTPException as e:
+        # 입력 검증 실패나 스케줄러의 예약 거절(503)은 학습이 실행되지 않은 것이므로 실패 모델로 등록하지 않습니다.
+        # 학습 실행 후의 오류(예: DB 등록 실패)는 산출물이 남아 있어야 하므로 정리하지 않고 그대로 전달합니다.
+        if launched:
+            print(f"모델 Job ID {job_id} 학습 후 처리 중 오류: {e.detail}")
+        elif job_id:
+            for path in (os.path.join(OUTPUT_BASE_DIR, "adapters", job_id), os.path.join(OUTPUT_BASE_DIR, "merged", job_id)):
+                if os.path.isdir(path) and not os.listdir(path):
+                    os.rmdir(path)
+        raise e
     except Exception as e:
         # 기타 예상치 못한 오류 처리
         print(f"Server error during training process: {e}")
         # 기타 예상치 못한 오류 발생 시 DB에 'failed' 상태로 등록
         if job_id:
              try:
-                 model_manager.register_trained_model(
+                 await model_manager.register_trained_model(
                      RegisterModelRequest(
                          job_id=job_id,
                          base_model_id=request_data.model_id,
@@ -175,6 +264,9 @@ async def start_training(request_data: TrainingRequest):
              except Exception as db_e:
                  print(f"학습 실패 후 DB 등록 중 추가 오류: {db_e}")
         raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
+    finally:
+        if job_id:
+            storage_manager.mark_job_finished(job_id)
 
 def huggingface_login(request_data: HuggingFaceLoginRequest):
     """
@@ -182,6 +274,7 @@ def huggingface_login(request_data: HuggingFaceLoginRequest):
     """
     print(f"HuggingFace 로그인 요청 수신: 토큰 길이 {len(request_data.hf_token)} ...") # NEW
     try:
+        from huggingface_hub import login # 로그인 요청 시에만 로드 (API 기동 시간 단축)
         login(token=request_data.hf_token, add_to_git_credential=True)
         print("HuggingFace Hub 로그인 성공적으로 완료됨.") # NEW
         return {"status": "success", "message": "HuggingFace 로그인 성공."}
@@ -1,8 +1,12 @@
 # models_ml/shared_models.py
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, Literal
 import datetime # ★★★ 이 줄이 있는지 반드시 확인해주세요. ★★★
 
+# CPU 양자화 모드 (models_ml/inference/cpu_quantization.SUPPORTED_QUANTIZATION과 동일하게 유지)
+# 요청 검증 단계에서 거절하여 토크나이저 로드나 메모리 예약 전에 422로 응답합니다.
+QuantizationMode = Literal["int8"]
+
 # 모든 Pydantic 모델을 여기에 정의합니다.
 class TrainingRequest(BaseModel):
     model_id: str
@@ -21,12 +25,24 @@ class TrainingRequest(BaseModel):
     lr_scheduler_type: str = 'constant'
     optim: str = 'adamw_torch_fused'
     file_type: str
+    num_workers: int = Field(1, ge=1) # 데이터 병렬 학습 워커(프로세스) 수. 1이면 기존 단일 프로세스 실행
+    use_cpu: bool = False # True이면 GPU 없이 CPU에서 학습 (gloo 백엔드 사용)
+    memory_estimate_gb: Optional[float] = None # 학습에 필요한 메모리(GB). 없으면 모델 크기로 추정하여 스케줄링
 
 class InferenceRequest(BaseModel):
     model_id: str
     question: str
     schema_info: Optional[str] = None
     bnb_4bit_compute_dtype: str = 'bfloat16'
+    quantization: Optional[QuantizationMode] = None # 'int8'이면 GPU 없이 CPU 양자화 모델로 추론
+    draft_model_id: Optional[str] = None # 보조 생성용 드래프트 모델 (레지스트리 job_id 또는 모델 경로/ID)
+    prompt_lookup_num_tokens: Optional[int] = None # 프롬프트 n-gram 드래프트 토큰 수 (draft_model_id와 함께 쓸 수 없음)
+
+    @model_validator(mode="after")
+    def check_single_draft_method(self):
+        if self.draft_model_id and self.prompt_lookup_num_tokens:
+            raise ValueError("draft_model_id와 prompt_lookup_num_tokens는 동시에 사용할 수 없습니다.")
+        return self
 
 class DataEntry(BaseModel):
     id: int
@@ -63,6 +79,19 @@ class RegisterModelRequest(BaseModel):
 class ModelActionRequest(BaseModel):
     job_id: str
 
+class EvaluationRequest(BaseModel): # 실행 정확도 평가 요청
+    job_id: str
+    limit: Optional[int] = None # 평가할 행 수 (없으면 text-to-sql 데이터 전체)
+    synthetic_rows: int = Field(20, ge=0) # 스키마로 만든 테이블마다 채울 합성 행 수 (0이면 빈 테이블)
+    timeout_seconds: float = Field(5.0, gt=0) # 쿼리 하나의 최대 실행 시간
+    bnb_4bit_compute_dtype: str = 'bfloat16'
+    quantization: Optional[QuantizationMode] = None
+
+class ProfilingSettingsRequest(BaseModel): # 프로파일링 관리자 토글 (지정한 값만 변경)
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = None # 0.01이면 요청의 1%를 프로파일링
+    torch_profiler: Optional[bool] = None
+
 # model_manager에서 사용할 응답 Pydantic 모델도 이곳에 정의
 class ModelEntryResponse(BaseModel):
     job_id: str
@@ -72,6 +101,7 @@ class ModelEntryResponse(BaseModel):
     training_date: datetime.datetime
     eval_accuracy: Optional[float] = None
     eval_loss: Optional[float] = None
+    execution_accuracy: Optional[float] = None
     lora_r: Optional[int] = None
     status: str
     description: Optional[str] = None
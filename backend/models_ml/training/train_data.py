@@ -32,6 +32,18 @@ def generate_messages(data, system_message_template): # system_message_template
         ]
     }
 
+def is_distributed():
+    """
+    torchrun(torch.distributed.run)으로 여러 워커가 실행된 경우 True를 반환합니다.
+    """
+    return int(os.environ.get("WORLD_SIZE", "1")) > 1
+
+def is_main_process():
+    """
+    rank 0 프로세스인지 확인합니다. 로그 출력과 모델 저장/병합은 rank 0에서만 수행합니다.
+    """
+    return int(os.environ.get("RANK", "0")) == 0
+
 def compute_metrics(eval_pred):
     """
     평가 단계에서 모델의 정확도를 계산합니다.
@@ -87,6 +99,8 @@ def train():
                         help="Learning rate scheduler type.")
     parser.add_argument("--optim", type=str, default='adamw_torch_fused',
                         help="Optimizer to use.")
+    parser.add_argument("--use_cpu", type=lambda x: x.lower() == 'true', default=False,
+                        help="Train on CPU (data-parallel workers use the gloo backend).")
 
     args = parser.parse_args()
 
@@ -100,17 +114,33 @@ def train():
     os.makedirs(var_MERGE_OUTPUT_DIR, exist_ok=True)
 
     # 3. BitsAndBytesConfig 설정 (인자 사용)
-    bnb_config = BitsAndBytesConfig(
-        load_in_4bit=args.load_in_4bit,
-        bnb_4bit_use_double_quant=True,
-        bnb_4bit_quant_type="nf4",
-        bnb_4bit_compute_dtype=eval(f"torch.{args.bnb_4bit_compute_dtype}") # 문자열을 torch.bfloat16 등으로 변환
-    )
+    # bitsandbytes 4-bit 양자화는 GPU가 필요하므로 CPU 학습에서는 사용하지 않습니다.
+    bnb_config = None
+    if not args.use_cpu:
+        bnb_config = BitsAndBytesConfig(
+            load_in_4bit=args.load_in_4bit,
+            bnb_4bit_use_double_quant=True,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_compute_dtype=eval(f"torch.{args.bnb_4bit_compute_dtype}") # 문자열을 torch.bfloat16 등으로 변환
+        )
+
+    # 데이터 병렬 학습에서는 각 워커가 모델 전체를 자신의 장치에 올려야 하므로 device_map="auto"를 쓰지 않습니다.
+    if args.use_cpu:
+        device_map = None
+    elif is_distributed():
+        device_map = {"": int(os.environ.get("LOCAL_RANK", "0"))}
+    else:
+        device_map = "auto"
+
+    # fused AdamW는 CPU를 지원하지 않는 torch 버전이 있으므로 CPU 학습에서는 일반 AdamW를 사용합니다.
+    optim = args.optim
+    if args.use_cpu and optim == 'adamw_torch_fused':
+        optim = 'adamw_torch'
 
     # 4. 모델 및 토크나이저 로드 (인자 사용)
     model = AutoModelForCausalLM.from_pretrained(
         args.model_id,
-        device_map="auto",
+        device_map=device_map,
         quantization_config=bnb_config,
         attn_implementation=args.attn_implementation,
         torch_dtype=eval(f"torch.{args.bnb_4bit_compute_dtype}"),
@@ -145,7 +175,14 @@ def train():
         save_strategy="epoch",
         bf16=True if args.bnb_4bit_compute_dtype == 'bfloat16' else False, # bfloat16 사용 여부도 dtype에 따라 설정
         tf32=False, # TF32는 특정 GPU 아키텍처에서만 지원되므로 기본적으로 False
-        optim=args.optim,
+        optim=optim,
+        use_cpu=args.use_cpu,
+
+        # 데이터 병렬 설정: 그래디언트는 모든 워커 간에 all-reduce로 동기화되고,
+        # 로그 출력과 체크포인트 저장은 Trainer가 rank 0에서만 수행합니다.
+        ddp_backend="gloo" if args.use_cpu and is_distributed() else None,
+        ddp_find_unused_parameters=False if is_distributed() else None,
+        gradient_checkpointing_kwargs={"use_reentrant": False} if is_distributed() else None,
 
         num_train_epochs=args.num_train_epochs,
         max_steps=-1,
@@ -183,11 +220,13 @@ def train():
     if len(processed_ds) < 2:
         raise ValueError("데이터셋 샘플 수가 너무 적습니다. 최소 2개 이상의 데이터가 필요합니다.")
 
-    dataset = processed_ds.train_test_split(test_size=0.2)
+    # 모든 워커가 동일한 train/test 분할을 사용하도록 분산 학습에서는 seed를 고정합니다.
+    dataset = processed_ds.train_test_split(test_size=0.2, seed=42 if is_distributed() else None)
     train_data = dataset["train"]
     eval_data  = dataset["test"]
 
-    print(f"Train size: {len(train_data)}, Test size: {len(eval_data)}")
+    if is_main_process():
+        print(f"Train size: {len(train_data)}, Test size: {len(eval_data)}")
 
     # 8. SFTTrainer 설정 및 학습 시작
     trainer = SFTTrainer (
@@ -216,11 +255,19 @@ def train():
     # 9. 모델 저장 및 병합
     trainer.save_model(var_TRAIN_OUTPUT_DIR)
 
+    # 분산 학습에서는 모든 워커가 학습을 마칠 때까지 기다린 뒤, 병합은 rank 0에서만 수행합니다.
+    if is_distributed():
+        trainer.accelerator.wait_for_everyone()
+        if torch.distributed.is_initialized():
+            torch.distributed.destroy_process_group()
+        if not is_main_process():
+            return
+
     peft_model = AutoPeftModelForCausalLM.from_pretrained(
         var_TRAIN_OUTPUT_DIR,
         torch_dtype=eval(f"torch.{args.bnb_4bit_compute_dtype}"), # compute_dtype에 따라 로드 dtype 설정
         low_cpu_mem_usage=True,
-        device_map="auto",
+        device_map=None if args.use_cpu else "auto",
     )
     merged_model = peft_model.merge_and_unload()
     merged_model.save_pretrained(var_MERGE_OUTPUT_DIR, safe_serialization=True, max_shard_size="2GB")
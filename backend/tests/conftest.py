@@ -0,0 +1,29 @@
+# tests/conftest.py
+# backend 폴더에서 `python -m pytest tests` 로 실행합니다.
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def registry(tmp_path, monkeypatch):
+    """
+    테스트마다 임시 SQLite 파일을 레지스트리로 사용하는 model_manager.
+    """
+    from models_ml.services import model_manager
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'registry.db'}")
+    for name in ("_database_url", "_engine", "_async_engine", "_async_session_factory"):
+        monkeypatch.setattr(model_manager, name, None)
+    model_manager.create_db_tables()
+    model_manager.invalidate_model_cache()
+    yield model_manager
+    await model_manager.dispose_engines()
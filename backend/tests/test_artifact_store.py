@@ -0,0 +1,27 @@
+# tests/test_artifact_store.py
+import os
+
+from models_ml.services import artifact_store
+
+def write(path, content: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+def test_ingest_links_duplicates_and_detach_copies_on_write(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write("models_ml/outputs/merged/job-1/tokenizer.json", b"same")
+    write("models_ml/outputs/merged/job-2/tokenizer.json", b"same")
+
+    stats = artifact_store.ingest_directories(["models_ml/outputs/merged/job-1", "models_ml/outputs/merged/job-2"])
+    assert stats["deduplicated_files"] == 1
+    first, second = "models_ml/outputs/merged/job-1/tokenizer.json", "models_ml/outputs/merged/job-2/tokenizer.json"
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+    # 작업 자신의 파일은 계속 쓸 수 있어야 합니다.
+    assert os.access(first, os.W_OK)
+
+    assert artifact_store.detach_file(first)
+    write(first, b"changed")
+    with open(second, "rb") as f:
+        assert f.read() == b"same"
+    assert not artifact_store.detach_file(first)
@@ -0,0 +1,25 @@
+# tests/test_eval_data.py
+import pytest
+
+eval_data = pytest.importorskip("models_ml.inference.eval_data")
+
+def test_speculative_stats_counts_drafts_per_verification_pass():
+    # 프롬프트 5토큰: 첫 검증 8토큰(드래프트 3), 이후 3토큰(직전 토큰 + 드래프트 2), 1토큰(드래프트 없음)
+    stats = eval_data._speculative_stats("prompt_lookup", [8, 3, 1], prompt_length=5, new_tokens=7)
+    assert stats["method"] == "prompt_lookup"
+    assert stats["target_forward_passes"] == 3
+    assert stats["drafted_tokens"] == 5
+    # 검증 호출마다 대상 모델이 1토큰을 직접 만들므로 수락된 드래프트는 7 - 3
+    assert stats["accepted_tokens"] == 4
+    assert stats["acceptance_rate"] == pytest.approx(0.8)
+    assert stats["target_forward_reduction"] == pytest.approx(7 / 3)
+
+def test_speculative_stats_caps_accepted_at_drafted():
+    stats = eval_data._speculative_stats("draft_model", [8, 3, 1], prompt_length=5, new_tokens=20)
+    assert stats["accepted_tokens"] == stats["drafted_tokens"] == 5
+
+def test_speculative_stats_without_passes():
+    stats = eval_data._speculative_stats("draft_model", [], prompt_length=5, new_tokens=0)
+    assert stats["drafted_tokens"] == 0
+    assert stats["acceptance_rate"] == 0.0
+    assert stats["target_forward_reduction"] == 1.0
@@ -0,0 +1,65 @@
+# tests/test_evaluation_manager.py
+import asyncio
+import os
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from models_ml.services import evaluation_manager
+from models_ml.shared_models import EvaluationRequest, RegisterModelRequest
+
+pytestmark = pytest.mark.anyio
+
+ROW = {"id": 1, "question": "q", "answer": "SELECT 1", "schema": "CREATE TABLE t (x INT);"}
+
+def crash_worker(task):
+    # 워커 프로세스가 비정상 종료된 경우 (spawn 워커가 이 모듈을 임포트하여 실행)
+    os._exit(1)
+
+@pytest.fixture
+async def evaluated_model(registry, monkeypatch):
+    monkeypatch.setattr(evaluation_manager, "_evaluations", {})
+    await registry.register_trained_model(RegisterModelRequest(
+        job_id="job-1", base_model_id="base", adapter_path="adapter", merged_path="merged",
+    ))
+    return "job-1"
+
+async def test_concurrent_prepare_is_rejected_while_loading_rows(evaluated_model, monkeypatch):
+    release = threading.Event()
+
+    def slow_load(limit):
+        release.wait(5)
+        return [ROW]
+
+    monkeypatch.setattr(evaluation_manager, "load_eval_rows", slow_load)
+    first = asyncio.create_task(evaluation_manager.prepare_evaluation(EvaluationRequest(job_id=evaluated_model)))
+    await asyncio.sleep(0.05)
+    try:
+        with pytest.raises(HTTPException) as error:
+            await evaluation_manager.prepare_evaluation(EvaluationRequest(job_id=evaluated_model))
+        assert error.value.status_code == 409
+    finally:
+        release.set()
+    plan = await first
+    assert plan["rows"] == [ROW]
+    assert evaluation_manager._evaluations[evaluated_model]["rows"] == 1
+
+async def test_failed_prepare_restores_previous_state(evaluated_model, monkeypatch):
+    previous = {"status": "completed", "report": {}}
+    evaluation_manager._evaluations[evaluated_model] = previous
+    monkeypatch.setattr(evaluation_manager, "load_eval_rows", lambda limit: [])
+    with pytest.raises(HTTPException) as error:
+        await evaluation_manager.prepare_evaluation(EvaluationRequest(job_id=evaluated_model))
+    assert error.value.status_code == 400
+    assert evaluation_manager._evaluations[evaluated_model] is previous
+
+def test_crashed_worker_is_recorded_per_row(monkeypatch):
+    eval_data = pytest.importorskip("models_ml.inference.eval_data")
+    monkeypatch.setattr(eval_data, "load_model_and_tokenizer", lambda *args: (object(), object()))
+    monkeypatch.setattr(eval_data, "generate_answer", lambda model, tokenizer, prompt: "SELECT 1")
+    monkeypatch.setattr(evaluation_manager.sql_execution, "evaluate_row", crash_worker)
+    monkeypatch.setattr(evaluation_manager, "EVAL_WORKERS", 1)
+    report = evaluation_manager.run_execution_eval("model", [ROW, ROW], EvaluationRequest(job_id="job-1"))
+    assert report["statuses"] == {"worker_error": 2}
+    assert report["execution_accuracy"] == 0.0
@@ -0,0 +1,45 @@
+# tests/test_model_manager.py
+import pytest
+from fastapi import HTTPException
+
+from models_ml.shared_models import RegisterModelRequest
+
+pytestmark = pytest.mark.anyio
+
+async def register(registry, job_id: str, status: str = 'completed'):
+    await registry.register_trained_model(RegisterModelRequest(
+        job_id=job_id, base_model_id="base", adapter_path=f"/tmp/{job_id}/a",
+        merged_path=f"/tmp/{job_id}/m", status=status,
+    ))
+
+async def statuses(registry):
+    return {model.job_id: model.status for model in await registry.get_all_models()}
+
+async def test_activate_swaps_deployed_model(registry):
+    await register(registry, "job-1")
+    await register(registry, "job-2")
+
+    await registry.activate_model("job-1")
+    assert await statuses(registry) == {"job-1": "deployed", "job-2": "completed"}
+
+    await registry.activate_model("job-2")
+    assert await statuses(registry) == {"job-1": "inactive", "job-2": "deployed"}
+
+async def test_activate_unknown_model_keeps_current_deployment(registry):
+    await register(registry, "job-1")
+    await registry.activate_model("job-1")
+
+    with pytest.raises(HTTPException) as error:
+        await registry.activate_model("job-missing")
+    assert error.value.status_code == 404
+    assert await statuses(registry) == {"job-1": "deployed"}
+
+async def test_activate_deleting_model_is_rejected(registry):
+    await register(registry, "job-1")
+    await register(registry, "job-2", status='deleting')
+    await registry.activate_model("job-1")
+
+    with pytest.raises(HTTPException) as error:
+        await registry.activate_model("job-2")
+    assert error.value.status_code == 404
+    assert await statuses(registry) == {"job-1": "deployed", "job-2": "deleting"}
@@ -0,0 +1,90 @@
+# tests/test_resource_scheduler.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from models_ml.services import resource_scheduler
+from models_ml.services.resource_scheduler import GB, ResourceScheduler
+
+pytestmark = pytest.mark.anyio
+
+def make_scheduler(capacity_gb: float) -> ResourceScheduler:
+    scheduler = ResourceScheduler()
+    scheduler._capacity["cuda"] = int(capacity_gb * GB)
+    return scheduler
+
+async def test_known_estimate_over_capacity_is_rejected():
+    scheduler = make_scheduler(4)
+    with pytest.raises(HTTPException) as error:
+        async with scheduler.reserve("interactive", "cuda", 5 * GB):
+            pass
+    assert error.value.status_code == 503
+
+async def test_unknown_estimate_is_admitted(monkeypatch):
+    monkeypatch.setattr(resource_scheduler, "SCHEDULER_UNKNOWN_MODEL_GB", 100)
+    scheduler = make_scheduler(4)
+    async with scheduler.reserve("interactive", "cuda", None) as reservation:
+        # 기본값이 용량보다 커도 거절하지 않고 용량 이내로만 예약합니다.
+        assert reservation["bytes"] == 4 * GB
+        assert reservation["estimated"] is False
+
+async def test_unknown_estimate_reserves_conservative_default():
+    scheduler = make_scheduler(40)
+    async with scheduler.reserve("interactive", "cuda", None) as reservation:
+        assert reservation["bytes"] == int(resource_scheduler.SCHEDULER_UNKNOWN_MODEL_GB * GB) > 0
+
+async def test_unknown_training_waits_for_whole_device():
+    scheduler = make_scheduler(40)
+    order = []
+
+    async def train():
+        async with scheduler.reserve("training", "cuda", None) as reservation:
+            assert reservation["bytes"] == 40 * GB
+            order.append("training")
+
+    async with scheduler.reserve("interactive", "cuda", None):
+        task = asyncio.create_task(train())
+        await asyncio.sleep(0.05)
+        # 크기를 모르는 학습은 다른 작업이 장치를 쓰는 동안 시작되지 않습니다.
+        assert order == []
+    await asyncio.wait_for(task, 1)
+    assert order == ["training"]
+
+async def test_waiting_requests_are_granted_by_priority():
+    scheduler = make_scheduler(4)
+    order = []
+
+    async def request(kind: str, label: str):
+        async with scheduler.reserve(kind, "cuda", 3 * GB, label=label):
+            order.append(label)
+
+    async with scheduler.reserve("batch", "cuda", 3 * GB, label="running"):
+        training = asyncio.ensure_future(request("training", "training"))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(request("interactive", "interactive"))
+        await asyncio.sleep(0)
+        # 용량이 찰 때까지는 둘 다 대기합니다.
+        assert [entry["label"] for entry in scheduler.snapshot()["waiting"]] == ["interactive", "training"]
+        assert order == []
+    await asyncio.gather(training, interactive)
+    assert order == ["interactive", "training"]
+    assert scheduler.reserved("cuda") == 0
+
+async def test_reservations_within_capacity_run_together():
+    scheduler = make_scheduler(4)
+    async with scheduler.reserve("training", "cuda", 2 * GB):
+        async with scheduler.reserve("interactive", "cuda", 2 * GB):
+            assert scheduler.reserved("cuda") == 4 * GB
+
+def test_local_model_is_sized_from_safetensors_only(tmp_path):
+    (tmp_path / "model.safetensors").write_bytes(b"0" * 1000)
+    (tmp_path / "pytorch_model.bin").write_bytes(b"0" * 5000)
+    assert resource_scheduler.estimate_model_bytes(str(tmp_path)) == 1000
+
+def test_unknown_hub_model_does_not_block_on_lookup(monkeypatch):
+    started = []
+    monkeypatch.setattr(resource_scheduler, "_cached_hub_model_bytes", lambda model_id: None)
+    monkeypatch.setattr(resource_scheduler, "_start_hub_lookup", started.append)
+    assert resource_scheduler.estimate_inference_bytes("org/unknown-model") is None
+    assert started == ["org/unknown-model"]
@@ -0,0 +1,32 @@
+# tests/test_shared_models.py
+import typing
+
+import pytest
+from pydantic import ValidationError
+
+from models_ml.shared_models import InferenceRequest, EvaluationRequest, QuantizationMode
+from models_ml.services import inference_manager
+
+def test_quantization_modes_match_cpu_quantization():
+    cpu_quantization = pytest.importorskip("models_ml.inference.cpu_quantization")
+    assert typing.get_args(QuantizationMode) == cpu_quantization.SUPPORTED_QUANTIZATION
+
+@pytest.mark.parametrize("model", [InferenceRequest, EvaluationRequest])
+def test_unsupported_quantization_is_rejected(model):
+    values = {"model_id": "m", "question": "q"} if model is InferenceRequest else {"job_id": "job-1"}
+    assert model(**values, quantization="int8").quantization == "int8"
+    with pytest.raises(ValidationError):
+        model(**values, quantization="int4")
+
+@pytest.mark.parametrize("model", [InferenceRequest, inference_manager.InferenceRequest])
+def test_draft_methods_are_mutually_exclusive(model):
+    assert model(model_id="m", question="q", draft_model_id="draft").draft_model_id == "draft"
+    assert model(model_id="m", question="q", prompt_lookup_num_tokens=3).prompt_lookup_num_tokens == 3
+    with pytest.raises(ValidationError):
+        model(model_id="m", question="q", draft_model_id="draft", prompt_lookup_num_tokens=3)
+
+@pytest.mark.parametrize("values", [{"synthetic_rows": -1}, {"timeout_seconds": 0}, {"timeout_seconds": -1.0}])
+def test_invalid_evaluation_limits_are_rejected(values):
+    assert EvaluationRequest(job_id="job-1", synthetic_rows=0).synthetic_rows == 0
+    with pytest.raises(ValidationError):
+        EvaluationRequest(job_id="job-1", **values)
@@ -0,0 +1,82 @@
+# tests/test_sql_execution.py
+import sqlite3
+
+import pytest
+
+from models_ml.inference import sql_execution
+
+SCHEMA = "CREATE TABLE Employees (employee_id INT PRIMARY KEY, name VARCHAR(255), salary INT);"
+
+def make_task(predicted: str, answer: str = "SELECT employee_id, name FROM Employees ORDER BY employee_id", **values):
+    task = {"index": 0, "schema": SCHEMA, "answer": answer, "predicted": predicted,
+            "synthetic_rows": 5, "seed": 0, "timeout_seconds": 2.0}
+    task.update(values)
+    return task
+
+def test_results_match_ordered_and_unordered():
+    gold = [(1, "a"), (2, "b"), (2, "b")]
+    assert sql_execution.results_match([(2, "b"), (1, "a"), (2, "b")], gold, ordered=False)
+    assert not sql_execution.results_match([(2, "b"), (1, "a"), (2, "b")], gold, ordered=True)
+    # 다중 집합 비교이므로 중복 개수가 다르면 불일치
+    assert not sql_execution.results_match([(1, "a"), (2, "b")], gold, ordered=False)
+    assert sql_execution.results_match([(1.0000001,)], [(1,)], ordered=True)
+
+def test_execute_query_times_out():
+    connection, _ = sql_execution.build_database(SCHEMA)
+    endless = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT count(*) FROM n"
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        sql_execution.execute_query(connection, endless, timeout_seconds=0.2)
+    connection.close()
+
+@pytest.mark.parametrize("statement", [
+    "DELETE FROM Employees",
+    "INSERT INTO Employees VALUES (99, 'x', 1)",
+    "DROP TABLE Employees",
+    "PRAGMA query_only = OFF",
+])
+def test_write_statements_are_rejected(statement):
+    result = sql_execution.evaluate_row(make_task(statement))
+    assert result["status"] == "pred_error"
+
+def test_attach_is_rejected(tmp_path):
+    target = tmp_path / "attached.db"
+    result = sql_execution.evaluate_row(make_task(f"ATTACH DATABASE '{target}' AS x"))
+    assert result["status"] == "pred_error"
+    assert not target.exists()
+
+def test_evaluate_row_statuses():
+    assert sql_execution.evaluate_row(make_task("SELECT employee_id, name FROM Employees ORDER BY employee_id"))["status"] == "match"
+    assert sql_execution.evaluate_row(make_task("SELECT employee_id, name FROM Employees ORDER BY employee_id DESC"))["status"] == "mismatch"
+    assert sql_execution.evaluate_row(make_task(""))["status"] == "pred_error"
+    assert sql_execution.evaluate_row(make_task("SELECT 1", answer="SELECT missing FROM Employees"))["status"] == "gold_error"
+
+def test_summarize_excludes_gold_failures():
+    report = sql_execution.summarize([
+        {"index": 0, "match": True, "status": "match", "gold_rows": 0},
+        {"index": 1, "match": False, "status": "mismatch", "gold_rows": 3},
+        {"index": 2, "match": False, "status": "pred_timeout"},
+        {"index": 3, "match": False, "status": "gold_error"},
+    ])
+    assert report["total"] == 4
+    assert report["evaluable"] == 3
+    assert report["matches"] == 1
+    assert report["execution_accuracy"] == pytest.approx(1 / 3)
+    assert report["empty_gold_matches"] == 1
+    assert sql_execution.summarize([])["execution_accuracy"] is None
+
+def test_normalize_prediction_strips_code_block():
+    assert sql_execution.normalize_prediction("설명\n```sql\nSELECT 1;\n```") == "SELECT 1;"
+    assert sql_execution.normalize_prediction(None) == ""
+
+@pytest.mark.parametrize("predicted", [
+    # 한 번의 함수 호출로 큰 값을 만드는 쿼리는 progress handler로 중단할 수 없으므로 길이 제한에 걸려야 합니다.
+    "SELECT randomblob(900000000)",
+    "SELECT zeroblob(900000000)",
+    # 인코딩할 수 없는 문자열은 sqlite3.Error가 아닌 UnicodeEncodeError를 냅니다.
+    "SELECT '\ud800'",
+])
+def test_unexecutable_predictions_are_pred_errors(predicted):
+    if "blob" in predicted and not hasattr(sqlite3.Connection, "setlimit"):
+        pytest.skip("Connection.setlimit은 Python 3.11 이상에서 사용할 수 있습니다.")
+    result = sql_execution.evaluate_row(make_task(predicted))
+    assert result["status"] == "pred_error"
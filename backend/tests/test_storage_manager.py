@@ -0,0 +1,39 @@
+# tests/test_storage_manager.py
+import os
+
+import pytest
+
+from models_ml.services import storage_manager
+from models_ml.shared_models import RegisterModelRequest
+
+pytestmark = pytest.mark.anyio
+
+async def register_deleting(registry, tmp_path, job_id: str):
+    adapter_path, merged_path = tmp_path / job_id / "adapter", tmp_path / job_id / "merged"
+    for path in (adapter_path, merged_path):
+        os.makedirs(path)
+        (path / "weights.bin").write_bytes(b"0" * 100)
+    await registry.register_trained_model(RegisterModelRequest(
+        job_id=job_id, base_model_id="base", adapter_path=str(adapter_path),
+        merged_path=str(merged_path), status='deleting',
+    ))
+    return adapter_path, merged_path
+
+async def test_reclaim_model_purges_row_after_folders_are_removed(registry, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    adapter_path, merged_path = await register_deleting(registry, tmp_path, "job-1")
+    assert await storage_manager.reclaim_model("job-1") == 200
+    assert not adapter_path.exists() and not merged_path.exists()
+    assert await registry.get_model("job-1") is None
+
+async def test_reclaim_model_keeps_deleting_row_when_folders_remain(registry, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    adapter_path, merged_path = await register_deleting(registry, tmp_path, "job-1")
+
+    def failing_rmtree(path, *args, **kwargs):
+        raise PermissionError(13, "Permission denied", str(path))
+    monkeypatch.setattr(storage_manager.shutil, "rmtree", failing_rmtree)
+
+    assert await storage_manager.reclaim_model("job-1") == 0
+    assert adapter_path.exists() and merged_path.exists()
+    assert (await registry.get_model("job-1")).status == 'deleting'
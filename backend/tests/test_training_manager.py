@@ -0,0 +1,55 @@
+# tests/test_training_manager.py
+import os
+import subprocess
+
+import pytest
+from fastapi import HTTPException
+
+from models_ml.services import training_manager, data_manager, artifact_store, model_manager
+from models_ml.shared_models import TrainingRequest
+
+pytestmark = pytest.mark.anyio
+
+def make_request(**overrides) -> TrainingRequest:
+    values = {"model_id": "base", "system_message": "", "file_type": "text-to-sql", "use_cpu": True,
+              "memory_estimate_gb": 0.001}
+    values.update(overrides)
+    return TrainingRequest(**values)
+
+@pytest.fixture
+def training_env(tmp_path, monkeypatch):
+    data_file = tmp_path / "data.xlsx"
+    data_file.write_bytes(b"")
+    monkeypatch.setattr(training_manager, "OUTPUT_BASE_DIR", str(tmp_path / "outputs"))
+    monkeypatch.setattr(data_manager, "get_typed_file_path", lambda file_type: str(data_file))
+    monkeypatch.setattr(artifact_store, "ingest_directories", lambda directories: {})
+    return tmp_path / "outputs"
+
+def job_dirs(outputs):
+    return [outputs / kind / name for kind in ("adapters", "merged") if (outputs / kind).exists()
+            for name in os.listdir(outputs / kind)]
+
+async def test_rejected_reservation_removes_empty_job_folders(training_env):
+    with pytest.raises(HTTPException) as error:
+        await training_manager.start_training(make_request(memory_estimate_gb=1e9))
+    assert error.value.status_code == 503
+    assert job_dirs(training_env) == []
+
+async def test_error_after_launch_keeps_training_outputs(training_env, monkeypatch):
+    def fake_run(command, **kwargs):
+        adapter_dir = command[command.index("--adapter_output_dir") + 1]
+        with open(os.path.join(adapter_dir, "adapter_model.safetensors"), "wb") as f:
+            f.write(b"0")
+        return subprocess.CompletedProcess(command, 0, stdout="", stderr="")
+
+    async def failing_register(request):
+        raise HTTPException(status_code=500, detail="DB 오류")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    monkeypatch.setattr(model_manager, "register_trained_model", failing_register)
+    with pytest.raises(HTTPException) as error:
+        await training_manager.start_training(make_request())
+    assert error.value.status_code == 500
+    # 학습이 끝난 뒤의 오류이므로 산출물 폴더는 그대로 남아 있어야 합니다.
+    assert len(job_dirs(training_env)) == 2
+    assert any(os.listdir(path) for path in job_dirs(training_env))